@@ -1,40 +1,117 @@
-from django_filters import (FilterSet, ModelChoiceFilter,
-                            ModelMultipleChoiceFilter, NumberFilter)
+from django.conf import settings
+from django.db.models import Case, Exists, IntegerField, OuterRef, Value, When
+from django_filters import (BaseInFilter, CharFilter, ChoiceFilter,
+                            FilterSet, ModelChoiceFilter,
+                            MultipleChoiceFilter, NumberFilter)
 from rest_framework import filters
 
-from food.models import Recipe, Tag
+from core.catalog import get_tag_choices, get_tag_ids_by_slug
+from core.ingredient_index import find_recipes
+from core.search import search_recipes
+from food.models import Favorite, Recipe, ShoppingCart
 from users.models import User
 
 
+class NumberInFilter(BaseInFilter, NumberFilter):
+    pass
+
+
 class FilterRecipe(FilterSet):
-    author = ModelChoiceFilter(queryset=User.objects.all())
-    tags = ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all(),
-    )
+    # unknown author is 400, validated by primary key lookup only
+    author = ModelChoiceFilter(queryset=User.objects.only('pk'))
+    # slugs validated by in-process tags cache
+    tags = MultipleChoiceFilter(choices=get_tag_choices, method='filter_tags')
     is_favorited = NumberFilter(max_value=1, method='filter_is_favorited')
     is_in_shopping_cart = NumberFilter(
         max_value=1, method='filter_is_in_shopping_cart'
     )
+    # full-text search by name, ingredients and description, ranked
+    search = CharFilter(method='filter_search')
+    # cook with ingredients ids: `have` with at most `missing` others,
+    # `contains` all of them
+    have = NumberInFilter(method='filter_ingredients')
+    missing = NumberFilter(
+        min_value=0,
+        max_value=settings.MAX_MISSING_INGREDIENTS,
+        method='filter_ingredients',
+    )
+    contains = NumberInFilter(method='filter_ingredients')
+    # last, replaces ordering of other filters
+    ordering = ChoiceFilter(
+        choices=(('trending', 'trending'),), method='filter_ordering'
+    )
+
+    def filter_tags(self, queryset, field_name, value):
+        # semi-join, recipe with several tags isn't duplicated
+        tag_ids_by_slug = get_tag_ids_by_slug()
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe=OuterRef('pk'),
+                tag_id__in=[tag_ids_by_slug[slug] for slug in value],
+            )
+        ))
 
     def filter_is_favorited(self, queryset, field_name, value):
         if self.request.user.is_authenticated and value:
-            queryset = queryset.filter(
-                in_favorite__user=self.request.user
-            )
+            queryset = queryset.filter(Exists(
+                Favorite.objects.filter(
+                    user=self.request.user, recipe=OuterRef('pk')
+                )
+            ))
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, field_name, value):
         if self.request.user.is_authenticated and value:
-            queryset = queryset.filter(
-                in_shoppingcart__user=self.request.user
-            )
+            queryset = queryset.filter(Exists(
+                ShoppingCart.objects.filter(
+                    user=self.request.user, recipe=OuterRef('pk')
+                )
+            ))
         return queryset
 
+    def filter_search(self, queryset, field_name, value):
+        return search_recipes(queryset, value)
+
+    def filter_ingredients(self, queryset, field_name, value):
+        # have, missing and contains are applied together once
+        data = self.form.cleaned_data
+        if field_name != ('have' if data.get('have') else 'contains'):
+            return queryset
+
+        missing = find_recipes(
+            have=[int(pk) for pk in data.get('have') or ()],
+            missing=int(data.get('missing') or 0),
+            contains=[int(pk) for pk in data.get('contains') or ()],
+        )
+        # recipes with fewer missing ingredients first
+        ids = sorted(missing, key=lambda pk: (missing[pk], -pk))
+        ids = ids[:settings.MAX_INGREDIENTS_SEARCH_RESULTS]
+
+        buckets = {}
+        for pk in ids:
+            buckets.setdefault(missing[pk], []).append(pk)
+
+        return queryset.filter(pk__in=ids).annotate(
+            missing_ingredients=Case(
+                *(
+                    When(pk__in=bucket, then=Value(count))
+                    for count, bucket in buckets.items()
+                ),
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        ).order_by('missing_ingredients', '-created', '-id')
+
+    def filter_ordering(self, queryset, field_name, value):
+        # time-decayed popularity, see core.trending
+        return queryset.order_by('-score', '-id')
+
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart',)
+        fields = (
+            'author', 'tags', 'is_favorited', 'is_in_shopping_cart', 'search',
+            'have', 'missing', 'contains', 'ordering',
+        )
 
 
 class IngredientFilter(filters.SearchFilter):
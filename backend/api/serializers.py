@@ -1,18 +1,39 @@
 import base64
+from functools import reduce
+from operator import or_
 
+from django.conf import settings
 from django.core.files.base import ContentFile
+from django.db import transaction
 from django.db.models import Q
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.utils import model_meta
 
-from food.models import (Favorite, Ingredient, IngredientAmount, Recipe,
-                         ShoppingCart, Subscribe, Tag)
+from core.background import run_in_background
+from core.catalog import ingredients_snapshot, tags_snapshot
+from core.exports import EXPORTERS
+from core.images import get_variants_urls, make_variants
+from food.models import (ExportJob, Favorite, Ingredient, IngredientAmount,
+                         Recipe, ShoppingCart, Subscribe, Tag)
 from users.models import User
 from users.serializers import UserSerializer
 
 WEEK = 60 * 24 * 7  # cooking_time for only the longest recipes
 
+# recipe card in lists, without description and ingredients
+CARD_FIELDS = (
+    'id',
+    'tags',
+    'author',
+    'name',
+    'image',
+    'image_variants',
+    'cooking_time',
+    'is_favorited',
+    'is_in_shopping_cart',
+)
+
 
 class Base64ImageField(serializers.ImageField):
     def to_internal_value(self, data):
@@ -24,50 +45,106 @@ class Base64ImageField(serializers.ImageField):
         return super().to_internal_value(data)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
-    class Meta:
-        fields = '__all__'
-        model = Ingredient
+class ImageVariantsField(serializers.Field):
+    # urls of resized recipe images, null while they are being made
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
 
+    def to_representation(self, recipe):
+        return get_variants_urls(recipe, self.context.get('request'))
 
-class TagSerializer(serializers.ModelSerializer):
-    class Meta:
-        fields = '__all__'
-        model = Tag
 
+class SparseFieldsetMixin:
+    """
+    Allow client to choose fields with `?fields=a,b` or `?omit=a,b`,
+    name from `fields_presets` in `?fields=` is expanded to its fields.
+    """
 
-class CreateFavoriteRecipeSerializer(serializers.ModelSerializer):
-    class Meta:
-        read_only_fields = ('name', 'image', 'cooking_time')
-        fields = ('id', *read_only_fields)
-        model = Recipe
+    fields_query_param = 'fields'
+    omit_query_param = 'omit'
+    fields_presets = {}
+    required_fields = ('id',)
 
-    def validate(self, data):
-        user = self.context['request'].user
-        recipe = self.instance
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
 
-        if Favorite.objects.filter(Q(user=user) & Q(recipe=recipe)).exists():
-            raise ValidationError("This recipe already in favorites")
+        if request is None or request.method != 'GET':
+            return
 
-        return data
+        requested = self.get_requested_fields(request)
+        for name in set(self.fields) - set(requested):
+            self.fields.pop(name)
+
+    @classmethod
+    def get_requested_fields(cls, request) -> list[str]:
+        def parse(param):
+            names = request.query_params.get(param, '').split(',')
+            return [name.strip() for name in names if name.strip()]
+
+        available = cls.Meta.fields
+        requested = set()
+
+        for name in parse(cls.fields_query_param):
+            requested.update(cls.fields_presets.get(name, (name,)))
+
+        if not requested:
+            requested = set(available)
 
+        requested -= set(parse(cls.omit_query_param))
+        requested.update(cls.required_fields)
 
-class CreateShoppingCartRecipeSerializer(serializers.ModelSerializer):
+        return [name for name in available if name in requested]
+
+
+class CatalogPrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    """
+    Validate primary key by in-process catalog snapshot without queries,
+    return instance built from the snapshot as if loaded from database.
+    """
+
+    def __init__(self, catalog, **kwargs):
+        self.catalog = catalog
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+        try:
+            item = self.catalog.get().by_id[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+        queryset = self.get_queryset()
+        return queryset.model.from_db(
+            queryset.db, list(item), list(item.values())
+        )
+
+
+class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
-        read_only_fields = ('name', 'image', 'cooking_time')
-        fields = ('id', *read_only_fields)
-        model = Recipe
+        fields = '__all__'
+        model = Ingredient
 
-    def validate(self, data):
-        user = self.context['request'].user
-        recipe = self.instance
 
-        if ShoppingCart.objects.filter(
-            Q(user=user) & Q(recipe=recipe)
-        ).exists():
-            raise ValidationError("This recipe already in shopping cart")
+class TagSerializer(serializers.ModelSerializer):
+    class Meta:
+        fields = '__all__'
+        model = Tag
 
-        return data
+
+class RecipeIdsSerializer(serializers.Serializer):
+    # recipes added to or removed from favorites or cart at once
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.MAX_BULK_RECIPES,
+    )
 
 
 class IngredientAmountSerializer(serializers.ModelSerializer):
@@ -84,8 +161,10 @@ class IngredientAmountSerializer(serializers.ModelSerializer):
 
 
 class CreateIngredientAmountSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(), source='ingredient'
+    id = CatalogPrimaryKeyField(
+        ingredients_snapshot,
+        queryset=Ingredient.objects.all(),
+        source='ingredient',
     )
     amount = serializers.IntegerField(min_value=1)
 
@@ -95,8 +174,8 @@ class CreateIngredientAmountSerializer(serializers.ModelSerializer):
 
 
 class RecipeSerializer(serializers.ModelSerializer):
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), many=True
+    tags = CatalogPrimaryKeyField(
+        tags_snapshot, queryset=Tag.objects.all(), many=True
     )
     ingredients = CreateIngredientAmountSerializer(many=True)
     name = serializers.CharField(min_length=3, max_length=64,)
@@ -118,6 +197,7 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('id', 'author')
 
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
@@ -128,11 +208,16 @@ class RecipeSerializer(serializers.ModelSerializer):
             ingredients
         )
 
-        recipe.tags.set(tags)
-        recipe.ingredients.set(ingredients)
+        # one insert for each relation, signals maintain caches, indexes
+        # and shopping lists
+        recipe.tags.add(*tags)
+        recipe.ingredients.add(*ingredients)
+
+        run_in_background(make_variants, recipe.pk)
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         info = model_meta.get_field_info(instance)
 
@@ -145,6 +230,9 @@ class RecipeSerializer(serializers.ModelSerializer):
 
         instance.save()
 
+        if 'image' in validated_data:
+            run_in_background(make_variants, instance.pk)
+
         for attr, value in m2m_fields:
             field = getattr(instance, attr)
 
@@ -158,21 +246,55 @@ class RecipeSerializer(serializers.ModelSerializer):
     def convert_ingredients_to_ingredients_amounts(self, ingredients):
         # convert list elements like
         # OrderedDict([('ingredient', <Ingredient: ...>), ('amount', ...)])
-        # on IngredientAmount objects
-        for index, ingredient in enumerate(ingredients):
-            ingredients[index], _ = IngredientAmount.objects.get_or_create(
-                ingredient=ingredient.get("ingredient"),
-                amount=ingredient.get("amount")
+        # on IngredientAmount objects with fixed number of queries
+        pairs = {
+            (ingredient['ingredient'].id, ingredient['amount'])
+            for ingredient in ingredients
+        }
+        if not pairs:
+            return []
+
+        amounts = self.get_ingredients_amounts(pairs)
+
+        missing = pairs - set(amounts)
+        if missing:
+            IngredientAmount.objects.bulk_create(
+                [
+                    IngredientAmount(ingredient_id=pk, amount=amount)
+                    for pk, amount in missing
+                ],
+                ignore_conflicts=True,
             )
-        return ingredients
+            # ids aren't returned with ignore_conflicts
+            amounts.update(self.get_ingredients_amounts(missing))
+
+        return list({
+            amounts[ingredient['ingredient'].id, ingredient['amount']]
+            for ingredient in ingredients
+        })
+
+    @staticmethod
+    def get_ingredients_amounts(pairs) -> dict:
+        # {(ingredient id, amount): IngredientAmount}
+        amounts = IngredientAmount.objects.filter(reduce(or_, (
+            Q(ingredient_id=ingredient_id, amount=amount)
+            for ingredient_id, amount in pairs
+        )))
+        return {
+            (amount.ingredient_id, amount.amount): amount
+            for amount in amounts
+        }
+
+
+class GetRecipeSerializer(SparseFieldsetMixin, RecipeSerializer):
+    fields_presets = {'card': CARD_FIELDS}
 
-
-class GetRecipeSerializer(RecipeSerializer):
     author = UserSerializer()
     tags = TagSerializer(many=True)
     ingredients = IngredientAmountSerializer(many=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -183,6 +305,7 @@ class GetRecipeSerializer(RecipeSerializer):
             'ingredients',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
             'is_favorited',
@@ -190,21 +313,46 @@ class GetRecipeSerializer(RecipeSerializer):
         )
         read_only_fields = ('id', 'author')
 
+    def to_representation(self, recipe):
+        # subscription on author annotated by RecipeViewSet queryset
+        if hasattr(recipe, 'author_is_subscribed'):
+            recipe.author.is_subscribed = recipe.author_is_subscribed
+
+        return super().to_representation(recipe)
+
     def get_is_favorited(self, recipe):
+        user = self.context['request'].user
+
+        if not user.is_authenticated:
+            return False
+
+        if hasattr(recipe, 'is_favorited'):
+            return recipe.is_favorited
+
         return Favorite.objects.filter(
-            Q(user=self.context['request'].user.id) & Q(recipe=recipe)
+            Q(user=user) & Q(recipe=recipe)
         ).exists()
 
     def get_is_in_shopping_cart(self, recipe):
+        user = self.context['request'].user
+
+        if not user.is_authenticated:
+            return False
+
+        if hasattr(recipe, 'is_in_shopping_cart'):
+            return recipe.is_in_shopping_cart
+
         return ShoppingCart.objects.filter(
-            Q(user=self.context['request'].user.id) & Q(recipe=recipe)
+            Q(user=user) & Q(recipe=recipe)
         ).exists()
 
 
 class SubscribeRecipeSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
 class UserGetSubscribeSerializer(serializers.ModelSerializer):
@@ -225,18 +373,33 @@ class UserGetSubscribeSerializer(serializers.ModelSerializer):
             'recipes_count',
         )
 
+    @staticmethod
+    def get_recipes_limit(request):
+        try:
+            return max(int(request.query_params['recipes_limit']), 0)
+        except (KeyError, ValueError):
+            return None
+
     def get_is_subscribed(self, user):
+        # annotated by subscriptions list
+        if hasattr(user, 'is_subscribed'):
+            return user.is_subscribed
+
         return Subscribe.objects.filter(
             Q(subscription=user) & Q(user=self.context['request'].user.id)
         ).exists()
 
     def get_recipes(self, user):
         request = self.context.get('request')
-        recipes_limit = request.query_params.get('recipes_limit')
+        recipes_limit = self.get_recipes_limit(request)
 
-        recipes = user.recipes.all()
-        if recipes_limit:
-            recipes = recipes[:int(recipes_limit)]
+        # prefetched by subscriptions list
+        if hasattr(user, 'top_recipes'):
+            recipes = user.top_recipes
+        else:
+            recipes = user.recipes.all()
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
 
         context = {'request': request}
         return SubscribeRecipeSerializer(
@@ -268,3 +431,34 @@ class SubscribeSerializer(serializers.ModelSerializer):
             'subscription',
         )
         read_only_fields = ('user', 'subscription',)
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    file_format = serializers.CharField(default='json')
+
+    class Meta:
+        model = ExportJob
+        fields = (
+            'id',
+            'kind',
+            'file_format',
+            'status',
+            'error',
+            'created',
+            'started',
+            'finished',
+            'expires',
+        )
+        read_only_fields = (
+            'status', 'error', 'created', 'started', 'finished', 'expires'
+        )
+
+    def validate(self, data):
+        _, file_formats = EXPORTERS[data['kind']]
+
+        if data['file_format'] not in file_formats:
+            raise ValidationError({
+                'file_format': f'Choose one of: {", ".join(file_formats)}'
+            })
+
+        return data
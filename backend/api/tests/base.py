@@ -0,0 +1,78 @@
+import base64
+import io
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from users.models import User
+
+
+def make_image() -> str:
+    file = io.BytesIO()
+    Image.new('RGB', (1, 1)).save(file, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        file.getvalue()
+    ).decode()
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class APITestCase(TestCase):
+    """
+    Commit hooks of every request run as if it was committed, so caches,
+    counters and indexes are updated as in production.
+    """
+
+    def setUp(self):
+        # versions and snapshots of other tests are in the cache
+        cache.clear()
+        self.client = APIClient()
+
+    @staticmethod
+    def make_user(name) -> User:
+        return User.objects.create_user(
+            email=f'{name}@mail.com', username=name, password='pass'
+        )
+
+    @staticmethod
+    def make_client(user) -> APIClient:
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def request(self, client, method, path, data=None, **extra):
+        return self.commit(
+            getattr(client, method), path, data, format='json', **extra
+        )
+
+    def commit(self, function, *args, **kwargs):
+        with self.captureOnCommitCallbacks() as callbacks:
+            result = function(*args, **kwargs)
+
+        # hooks may register hooks of their own
+        while callbacks:
+            with self.captureOnCommitCallbacks() as added:
+                for callback in callbacks:
+                    callback()
+            callbacks = added
+
+        return result
+
+    def create_recipe(self, client, ingredients, tags, **data):
+        # ingredients are {ingredient: amount}
+        response = self.request(client, 'post', '/api/recipes/', {
+            'name': 'recipe',
+            'text': 'text',
+            'cooking_time': 10,
+            'image': make_image(),
+            'tags': [tag.id for tag in tags],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': amount}
+                for ingredient, amount in ingredients.items()
+            ],
+            **data,
+        })
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.data['id']
@@ -0,0 +1,100 @@
+from rest_framework.test import APIClient
+
+from food.models import Ingredient, Tag
+from users.authentication import tokens
+from users.models import User
+
+from .base import APITestCase
+
+
+class CachedTokenAuthenticationTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        tokens.items.clear()
+        self.user = User.objects.create_user(
+            email='user@mail.com', username='user', password='old-Pass-123'
+        )
+        self.tag = Tag.objects.create(name='tag', slug='tag')
+        self.ingredient = Ingredient.objects.create(
+            name='ingredient', measurement_unit='g'
+        )
+        self.login(self.client, 'old-Pass-123')
+
+    def login(self, client, password):
+        response = self.request(client, 'post', '/api/auth/token/login/', {
+            'email': 'user@mail.com', 'password': password,
+        })
+        if response.status_code == 200:
+            client.credentials(
+                HTTP_AUTHORIZATION=f'Token {response.data["auth_token"]}'
+            )
+        return response
+
+    def me(self):
+        return self.request(self.client, 'get', '/api/users/me/')
+
+    def test_cached_token_needs_no_queries(self):
+        # token and tags snapshot are loaded
+        self.request(self.client, 'get', '/api/tags/')
+        with self.assertNumQueries(0):
+            response = self.request(self.client, 'get', '/api/tags/')
+        self.assertEqual(response.status_code, 200)
+
+        # another worker has only the shared cache
+        tokens.items.clear()
+        with self.assertNumQueries(0):
+            self.request(self.client, 'get', '/api/tags/')
+
+    def test_logout(self):
+        self.assertEqual(self.me().status_code, 200)
+
+        response = self.request(self.client, 'post', '/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_deactivated_user(self):
+        self.assertEqual(self.me().status_code, 200)
+
+        self.user.is_active = False
+        self.commit(self.user.save)
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_changed_user_is_seen(self):
+        self.me()
+
+        self.user.first_name = 'new name'
+        self.commit(self.user.save)
+        self.assertEqual(self.me().data['first_name'], 'new name')
+
+        self.commit(self.user.delete)
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_set_password_keeps_counters(self):
+        response = self.me()
+        self.assertEqual(response.status_code, 200)
+        recipe_id = self.create_recipe(
+            self.client, {self.ingredient: 1}, [self.tag]
+        )
+
+        response = self.request(
+            self.client, 'post', '/api/users/set_password/', {
+                'current_password': 'old-Pass-123',
+                'new_password': 'new-Pass-456',
+            }
+        )
+        self.assertEqual(response.status_code, 204, response.content)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.recipes_count, 1)
+
+        response = self.request(
+            self.client, 'delete', f'/api/recipes/{recipe_id}/'
+        )
+        self.assertEqual(response.status_code, 204)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.recipes_count, 0)
+
+        # token of the session still works, password is new
+        self.assertEqual(self.me().status_code, 200)
+        client = APIClient()
+        self.assertEqual(self.login(client, 'old-Pass-123').status_code, 400)
+        self.assertEqual(self.login(client, 'new-Pass-456').status_code, 200)
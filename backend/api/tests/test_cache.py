@@ -0,0 +1,73 @@
+from food.models import Ingredient, Recipe, Tag
+
+from .base import APITestCase
+
+
+class AnonymousResponseCacheTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = self.make_user('author')
+        self.author_client = self.make_client(self.author)
+        self.tag = Tag.objects.create(name='tag', slug='tag')
+        self.ingredient = Ingredient.objects.create(
+            name='ingredient', measurement_unit='g'
+        )
+        self.recipe_id = self.create_recipe(
+            self.author_client, {self.ingredient: 1}, [self.tag]
+        )
+
+    def get(self, path):
+        return self.request(self.client, 'get', path)
+
+    def test_list_is_cached_until_recipe_changes(self):
+        response = self.get('/api/recipes/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        response = self.get('/api/recipes/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['count'], 1)
+
+        self.request(
+            self.author_client, 'patch', f'/api/recipes/{self.recipe_id}/',
+            {'name': 'new name'},
+        )
+        response = self.get('/api/recipes/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['name'], 'new name')
+
+    def test_query_order_doesnt_matter(self):
+        self.get('/api/recipes/?tags=tag&author=1')
+        response = self.get('/api/recipes/?author=1&tags=tag')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_detail_is_dropped_by_changes_of_related_rows(self):
+        path = f'/api/recipes/{self.recipe_id}/'
+        self.get(path)
+
+        self.assertEqual(self.get(path)['X-Cache'], 'HIT')
+
+        self.tag.name = 'new tag'
+        self.commit(self.tag.save)
+        response = self.get(path)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['tags'][0]['name'], 'new tag')
+
+        self.author.first_name = 'new name'
+        self.commit(self.author.save)
+        response = self.get(path)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['author']['first_name'], 'new name')
+
+    def test_deleted_recipe_isnt_served_from_cache(self):
+        path = f'/api/recipes/{self.recipe_id}/'
+        self.get(path)
+        self.get('/api/recipes/')
+
+        self.commit(Recipe.objects.get(pk=self.recipe_id).delete)
+        self.assertEqual(self.get(path).status_code, 404)
+        self.assertEqual(self.get('/api/recipes/').data['count'], 0)
+
+    def test_authenticated_responses_arent_cached(self):
+        self.get('/api/recipes/')
+        response = self.request(self.author_client, 'get', '/api/recipes/')
+        self.assertNotIn('X-Cache', response)
+        self.assertFalse(response.data['results'][0]['is_favorited'])
@@ -0,0 +1,60 @@
+from food.models import Ingredient, Tag
+
+from .base import APITestCase
+
+
+class CatalogSnapshotTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.tag = Tag.objects.create(name='tag', slug='tag')
+        self.ingredient = Ingredient.objects.create(
+            name='ingredient', measurement_unit='g'
+        )
+        self.client = self.make_client(self.make_user('author'))
+
+    def test_lists_without_queries(self):
+        self.request(self.client, 'get', '/api/tags/')
+        self.request(self.client, 'get', '/api/ingredients/')
+
+        with self.assertNumQueries(0):
+            response = self.request(self.client, 'get', '/api/tags/')
+        self.assertEqual(response.json()[0]['slug'], 'tag')
+        with self.assertNumQueries(0):
+            response = self.request(
+                self.client, 'get', f'/api/ingredients/{self.ingredient.id}/'
+            )
+        self.assertEqual(response.json()['name'], 'ingredient')
+
+    def test_snapshot_is_reloaded_after_change(self):
+        self.request(self.client, 'get', '/api/tags/')
+
+        tag = self.commit(Tag.objects.create, name='new', slug='new')
+        response = self.request(self.client, 'get', '/api/tags/')
+        self.assertEqual(
+            sorted(item['slug'] for item in response.json()), ['new', 'tag']
+        )
+
+        # new tag and ingredient are valid for recipes at once
+        ingredient = self.commit(
+            Ingredient.objects.create, name='new', measurement_unit='kg'
+        )
+        recipe_id = self.create_recipe(self.client, {ingredient: 1}, [tag])
+        response = self.request(
+            self.client, 'get', f'/api/recipes/{recipe_id}/'
+        )
+        self.assertEqual(response.data['tags'][0]['slug'], 'new')
+
+        self.commit(ingredient.delete)
+        response = self.request(self.client, 'post', '/api/recipes/', {
+            'name': 'recipe',
+            'text': 'text',
+            'cooking_time': 10,
+            'tags': [tag.id],
+            'ingredients': [{'id': ingredient.id, 'amount': 1}],
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ingredients', response.data)
+
+    def test_unknown_tag_filter(self):
+        response = self.request(self.client, 'get', '/api/recipes/?tags=none')
+        self.assertEqual(response.status_code, 400)
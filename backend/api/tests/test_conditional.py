@@ -0,0 +1,70 @@
+from food.models import Favorite, Ingredient, Tag
+
+from .base import APITestCase
+
+
+class ConditionalGetTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = self.make_user('author')
+        self.author_client = self.make_client(self.author)
+        self.tag = Tag.objects.create(name='tag', slug='tag')
+        self.ingredient = Ingredient.objects.create(
+            name='ingredient', measurement_unit='g'
+        )
+        self.recipe_id = self.create_recipe(
+            self.author_client, {self.ingredient: 1}, [self.tag]
+        )
+
+    def get(self, client, path, etag=None):
+        extra = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.request(client, 'get', path, **extra)
+
+    def test_not_modified_without_queries(self):
+        for path in (
+            '/api/recipes/', f'/api/recipes/{self.recipe_id}/',
+            '/api/tags/', '/api/ingredients/',
+        ):
+            etag = self.get(self.client, path)['ETag']
+            with self.assertNumQueries(0):
+                response = self.get(self.client, path, etag)
+            self.assertEqual(response.status_code, 304, path)
+            self.assertEqual(response['ETag'], etag)
+
+    def test_etag_changes_with_data(self):
+        path = f'/api/recipes/{self.recipe_id}/'
+        etag = self.get(self.client, path)['ETag']
+
+        self.request(
+            self.author_client, 'patch', path, {'cooking_time': 20}
+        )
+        response = self.get(self.client, path, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['cooking_time'], 20)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = self.get(self.client, '/api/tags/')['ETag']
+        self.commit(Tag.objects.create, name='other', slug='other')
+        response = self.get(self.client, '/api/tags/', etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_etag_depends_on_viewer(self):
+        path = f'/api/recipes/{self.recipe_id}/'
+        user = self.make_user('user')
+        client = self.make_client(user)
+
+        anonymous_etag = self.get(self.client, path)['ETag']
+        etag = self.get(client, path)['ETag']
+        self.assertNotEqual(etag, anonymous_etag)
+
+        # favorites of viewer change flags of the recipe
+        self.commit(
+            Favorite.objects.create, user=user, recipe_id=self.recipe_id
+        )
+        response = self.get(client, path, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_favorited'])
+        self.assertEqual(
+            self.get(self.client, path, anonymous_etag).status_code, 304
+        )
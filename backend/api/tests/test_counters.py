@@ -0,0 +1,82 @@
+import io
+from contextlib import redirect_stdout
+
+from django.core.management import call_command
+
+from food.models import Ingredient, Recipe, Tag
+from users.models import User
+
+from .base import APITestCase
+
+
+class CountersTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = self.make_user('author')
+        self.author_client = self.make_client(self.author)
+        self.user = self.make_user('user')
+        self.user_client = self.make_client(self.user)
+        self.tag = Tag.objects.create(name='tag', slug='tag')
+        self.ingredient = Ingredient.objects.create(
+            name='ingredient', measurement_unit='g'
+        )
+        self.recipe_id = self.create_recipe(
+            self.author_client, {self.ingredient: 1}, [self.tag]
+        )
+
+    def assertCounters(self, recipes_count, followers_count, favorites_count,
+                       shopping_carts_count):
+        author = User.objects.get(pk=self.author.pk)
+        self.assertEqual(
+            (author.recipes_count, author.followers_count),
+            (recipes_count, followers_count),
+        )
+        recipe = Recipe.objects.filter(pk=self.recipe_id).first()
+        if recipe is not None:
+            self.assertEqual(
+                (recipe.favorites_count, recipe.shopping_carts_count),
+                (favorites_count, shopping_carts_count),
+            )
+
+    def test_counters_follow_changes(self):
+        self.assertCounters(1, 0, 0, 0)
+
+        recipe_path = f'/api/recipes/{self.recipe_id}/'
+        self.request(self.user_client, 'post', recipe_path + 'favorite/')
+        self.request(self.user_client, 'post', recipe_path + 'shopping_cart/')
+        self.request(self.author_client, 'post', recipe_path + 'favorite/')
+        self.request(
+            self.user_client, 'post', f'/api/users/{self.author.pk}/subscribe/'
+        )
+        self.assertCounters(1, 1, 2, 1)
+
+        self.request(self.user_client, 'delete', recipe_path + 'favorite/')
+        self.request(
+            self.user_client, 'delete',
+            f'/api/users/{self.author.pk}/subscribe/',
+        )
+        self.assertCounters(1, 0, 1, 1)
+
+        self.request(self.author_client, 'delete', recipe_path)
+        self.assertCounters(0, 0, 0, 0)
+
+    def test_subscriptions_show_recipes_count(self):
+        self.create_recipe(
+            self.author_client, {self.ingredient: 2}, [self.tag]
+        )
+        self.request(
+            self.user_client, 'post', f'/api/users/{self.author.pk}/subscribe/'
+        )
+
+        response = self.request(
+            self.user_client, 'get', '/api/users/subscriptions/'
+        )
+        self.assertEqual(response.data['results'][0]['recipes_count'], 2)
+
+    def test_recount_repairs_counters(self):
+        Recipe.objects.filter(pk=self.recipe_id).update(favorites_count=5)
+        User.objects.filter(pk=self.author.pk).update(recipes_count=0)
+
+        with redirect_stdout(io.StringIO()):
+            call_command('recount')
+        self.assertCounters(1, 0, 0, 0)
@@ -0,0 +1,92 @@
+from django.test import override_settings
+from django.utils import timezone
+
+from food.models import FeedEntry, Ingredient, Recipe, Tag
+
+from .base import APITestCase
+
+
+class FeedTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('user')
+        self.user_client = self.make_client(self.user)
+        self.tag = Tag.objects.create(name='tag', slug='tag')
+        self.ingredient = Ingredient.objects.create(
+            name='ingredient', measurement_unit='g'
+        )
+        self.authors = [self.make_user(f'author{i}') for i in range(3)]
+
+    def publish(self, author) -> int:
+        return self.create_recipe(
+            self.make_client(author), {self.ingredient: 1}, [self.tag]
+        )
+
+    def subscribe(self, author, method='post'):
+        response = self.request(
+            self.user_client, method, f'/api/users/{author.pk}/subscribe/'
+        )
+        self.assertIn(response.status_code, (201, 204))
+
+    def feed(self, limit=100) -> list[int]:
+        # all pages
+        ids = []
+        path = f'/api/recipes/feed/?limit={limit}'
+        while path:
+            response = self.request(self.user_client, 'get', path)
+            self.assertEqual(response.status_code, 200, response.content)
+            ids += [recipe['id'] for recipe in response.data['results']]
+            path = response.data['next']
+        return ids
+
+    def test_feed_of_followed_authors(self):
+        first, second, other = self.authors
+        old = [self.publish(first), self.publish(second)]
+        self.publish(other)
+
+        self.subscribe(first)
+        self.subscribe(second)
+        self.assertEqual(self.feed(), old[::-1])
+
+        new = self.publish(first)
+        self.assertEqual(self.feed(), [new, *old[::-1]])
+        self.assertEqual(self.feed(limit=1), [new, *old[::-1]])
+
+        self.subscribe(first, 'delete')
+        self.assertEqual(self.feed(), old[1:])
+
+        response = self.request(self.client, 'get', '/api/recipes/feed/')
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(FEED_FANOUT_LIMIT=2)
+    def test_authors_with_many_followers_are_read(self):
+        light, heavy, follower = self.authors
+        self.request(
+            self.make_client(follower), 'post',
+            f'/api/users/{heavy.pk}/subscribe/',
+        )
+        self.subscribe(light)
+        self.subscribe(heavy)
+
+        ids = [self.publish(author) for author in (heavy, light, heavy)]
+        self.assertEqual(self.feed(), ids[::-1])
+        self.assertEqual(self.feed(limit=2), ids[::-1])
+
+        # author with fewer followers again writes to feeds
+        self.request(
+            self.make_client(follower), 'delete',
+            f'/api/users/{heavy.pk}/subscribe/',
+        )
+        ids.append(self.publish(heavy))
+        self.assertEqual(self.feed(limit=1), ids[::-1])
+
+    def test_recipes_published_at_once(self):
+        author = self.authors[0]
+        self.subscribe(author)
+        ids = [self.publish(author) for _ in range(3)]
+        # imported in one batch
+        now = timezone.now()
+        Recipe.objects.update(created=now)
+        FeedEntry.objects.update(created=now)
+
+        self.assertEqual(self.feed(limit=1), ids[::-1])
@@ -0,0 +1,108 @@
+import io
+import json
+import os
+import tempfile
+from contextlib import redirect_stdout
+
+from django.core.management import call_command
+
+from food.models import Ingredient, Recipe, Tag
+from users.models import User
+
+from .base import APITestCase
+
+
+class ImportRecipesTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = self.make_user('author')
+        self.tag = Tag.objects.create(name='Breakfast', slug='breakfast')
+        self.egg = Ingredient.objects.create(
+            name='Eggs', measurement_unit='pcs'
+        )
+        Ingredient.objects.create(name='milk', measurement_unit='ml')
+        self.directory = tempfile.mkdtemp()
+        with open(os.path.join(self.directory, 'omelette.png'), 'wb') as file:
+            file.write(b'image')
+
+    def write(self, name, lines) -> str:
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(lines)
+        return path
+
+    def run_import(self, path, *args) -> str:
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.commit(call_command, 'import_recipes', path, *args)
+        return output.getvalue()
+
+    def get(self, query) -> list[str]:
+        response = self.request(self.client, 'get', f'/api/recipes/?{query}')
+        return [recipe['name'] for recipe in response.data['results']]
+
+    def test_import_jsonl(self):
+        records = [
+            {
+                'name': 'Omelette', 'text': 'Beat', 'cooking_time': 10,
+                'author': 'author@mail.com', 'tags': ['breakfast'],
+                'ingredients': [
+                    {'name': 'eggs', 'amount': 3},
+                    {'name': 'Milk', 'measurement_unit': 'ML', 'amount': 50},
+                ],
+                'image': 'omelette.png',
+            },
+            {
+                'name': 'Boiled egg', 'text': 'Boil', 'cooking_time': 5,
+                'author': 'author',
+                'ingredients': [{'id': self.egg.id, 'amount': 1}],
+            },
+            {'name': 'No author', 'text': 'x', 'cooking_time': 1,
+             'author': 'nobody',
+             'ingredients': [{'name': 'eggs', 'amount': 1}]},
+            {'name': 'No image', 'text': 'x', 'cooking_time': 1,
+             'author': 'author', 'image': 'missing.png',
+             'ingredients': [{'name': 'eggs', 'amount': 1}]},
+            {'name': 'No ingredients', 'text': 'x', 'cooking_time': 1,
+             'author': 'author', 'ingredients': []},
+        ]
+        path = self.write('recipes.jsonl', ''.join(
+            json.dumps(record) + '\n' for record in records
+        ))
+
+        output = self.run_import(path, '--batch-size', '2')
+        self.assertIn('2 imported, 3 skipped', output)
+
+        omelette = Recipe.objects.get(name='Omelette')
+        self.assertEqual(
+            sorted(omelette.ingredients.values_list(
+                'ingredient__name', 'amount'
+            )),
+            [('Eggs', 3), ('milk', 50)],
+        )
+        self.assertEqual(list(omelette.tags.all()), [self.tag])
+        self.assertTrue(omelette.image.name.endswith('.png'))
+        self.assertEqual(User.objects.get(pk=self.author.pk).recipes_count, 2)
+
+        # indexes are filled and lists aren't served from cache
+        self.assertEqual(self.get('search=boil'), ['Boiled egg'])
+        self.assertEqual(self.get(f'have={self.egg.id}'), ['Boiled egg'])
+        self.assertEqual(self.get('tags=breakfast'), ['Omelette'])
+
+        # finished import isn't repeated
+        output = self.run_import(path)
+        self.assertIn('0 imported', output)
+        self.assertEqual(Recipe.objects.count(), 2)
+
+    def test_import_csv(self):
+        path = self.write('recipes.csv', (
+            'name,text,cooking_time,author,tags,ingredients\n'
+            'Omelette,Beat,10,author,breakfast,eggs:3|milk:50\n'
+            'Pancakes,Fry,20,author,,eggs:1|flour:100\n'
+        ))
+
+        output = self.run_import(path)
+        self.assertIn('1 imported, 1 skipped', output)
+        self.assertEqual(
+            Recipe.objects.get().ingredients.count(), 2
+        )
@@ -0,0 +1,91 @@
+import io
+from contextlib import redirect_stdout
+
+from django.core.management import call_command
+
+from food.models import Ingredient, Recipe, RecipeIndex, Tag
+
+from .base import APITestCase
+
+
+class CookWithWhatIHaveTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.author_client = self.make_client(self.make_user('author'))
+        self.tag = Tag.objects.create(name='tag', slug='tag')
+        self.egg, self.milk, self.salt, self.flour = [
+            Ingredient.objects.create(name=name, measurement_unit='g')
+            for name in ('egg', 'milk', 'salt', 'flour')
+        ]
+        self.boiled_egg = self.create_recipe(
+            self.author_client, {self.egg: 2}, [self.tag]
+        )
+        self.omelette = self.create_recipe(
+            self.author_client, {self.egg: 3, self.milk: 50, self.salt: 1},
+            [self.tag],
+        )
+        self.pancakes = self.create_recipe(
+            self.author_client,
+            {self.egg: 1, self.milk: 200, self.flour: 100, self.salt: 1},
+            [self.tag],
+        )
+
+    def find(self, query) -> list[int]:
+        response = self.request(self.client, 'get', f'/api/recipes/?{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def ids(self, *ingredients) -> str:
+        return ','.join(str(ingredient.id) for ingredient in ingredients)
+
+    def test_have_and_missing(self):
+        have = self.ids(self.egg, self.milk)
+        self.assertEqual(self.find(f'have={have}'), [self.boiled_egg])
+        # fewer missing ingredients first
+        self.assertEqual(
+            self.find(f'have={have}&missing=1'),
+            [self.boiled_egg, self.omelette],
+        )
+        self.assertEqual(
+            self.find(f'have={have}&missing=2'),
+            [self.boiled_egg, self.omelette, self.pancakes],
+        )
+        self.assertEqual(self.find(f'have={self.ids(self.flour)}'), [])
+        self.assertEqual(
+            self.find(f'have={have}&missing=2&contains={self.flour.id}'),
+            [self.pancakes],
+        )
+        self.assertEqual(
+            self.find(f'contains={self.ids(self.egg, self.salt)}'),
+            [self.pancakes, self.omelette],
+        )
+        response = self.request(
+            self.client, 'get', f'/api/recipes/?have={have}&missing=100'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_index_follows_changes(self):
+        have = self.ids(self.egg, self.milk, self.salt)
+        self.request(
+            self.author_client, 'patch', f'/api/recipes/{self.omelette}/',
+            {'ingredients': [{'id': self.flour.id, 'amount': 1}]},
+        )
+        self.commit(Recipe.objects.get(pk=self.boiled_egg).delete)
+        self.assertEqual(self.find(f'have={have}'), [])
+        self.assertEqual(
+            self.find(f'have={have}&missing=1'), [self.pancakes]
+        )
+        self.assertEqual(
+            self.find(f'contains={self.flour.id}'),
+            [self.pancakes, self.omelette],
+        )
+
+        # rebuilt index is the same
+        rows = set(RecipeIndex.objects.values_list(
+            'kind', 'key', 'shard', 'ids'
+        ))
+        with redirect_stdout(io.StringIO()):
+            call_command('ingredient_index')
+        self.assertEqual(set(RecipeIndex.objects.values_list(
+            'kind', 'key', 'shard', 'ids'
+        )), rows)
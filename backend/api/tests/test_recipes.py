@@ -0,0 +1,109 @@
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from food.models import Ingredient, Recipe, Tag
+from users.models import User
+
+from .base import make_image
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class RecipeCreateQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='author@mail.com', username='author', password='pass'
+        )
+        cls.tags = [
+            Tag.objects.create(name=f'tag {i}', slug=f'tag{i}')
+            for i in range(3)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'ingredient {i}', measurement_unit='g'
+            )
+            for i in range(50)
+        ]
+
+    def setUp(self):
+        # catalog versions of other tests are in the cache
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_data(self, ingredients, amount=1):
+        return {
+            'name': 'recipe',
+            'text': 'text',
+            'cooking_time': 10,
+            'image': make_image(),
+            'tags': [tag.id for tag in self.tags],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': amount}
+                for ingredient in ingredients
+            ],
+        }
+
+    def create(self, ingredients, amount=1):
+        response = self.client.post(
+            '/api/recipes/', self.get_data(ingredients, amount), format='json'
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        return response
+
+    def test_create_queries_dont_depend_on_ingredients(self):
+        # load catalog snapshots
+        self.create(self.ingredients[:1])
+
+        # new ingredient amounts in both recipes. 18 queries: 2 savepoints
+        # and 2 releases (atomic view and serializer), recipe insert,
+        # author counter, feed fan-out (2), amounts (select, insert of
+        # missing, select of inserted), tags and ingredients (select of
+        # present, insert), carts of recipe for shopping lists, tags and
+        # ingredients of response
+        with self.assertNumQueries(18):
+            self.create(self.ingredients[:1], amount=2)
+        with self.assertNumQueries(18):
+            response = self.create(self.ingredients, amount=3)
+
+        recipe = Recipe.objects.get(pk=response.data['id'])
+        self.assertEqual(recipe.ingredients.count(), 50)
+        self.assertEqual(recipe.tags.count(), 3)
+
+    def test_update_tags(self):
+        response = self.create(self.ingredients[:2])
+
+        response = self.client.patch(
+            f'/api/recipes/{response.data["id"]}/',
+            {'tags': [self.tags[0].id]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data['tags'], [self.tags[0].id])
+
+
+class RecipeCursorTest(TestCase):
+    def test_cursor_with_filter_ordering(self):
+        client = APIClient()
+
+        response = client.get('/api/recipes/?pagination=cursor&search=soup')
+        self.assertEqual(response.status_code, 400)
+        response = client.get('/api/recipes/?pagination=cursor&have=1')
+        self.assertEqual(response.status_code, 400)
+
+        for query in ('', '&ordering=trending'):
+            response = client.get(f'/api/recipes/?pagination=cursor{query}')
+            self.assertEqual(response.status_code, 200)
+
+
+class RecipeFilterTest(TestCase):
+    def test_filter_by_unknown_author(self):
+        client = APIClient()
+
+        response = client.get('/api/recipes/?author=999999')
+        self.assertEqual(response.status_code, 400)
+        response = client.get('/api/recipes/?author=abc')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,63 @@
+from food.models import Ingredient, Recipe, Tag
+
+from .base import APITestCase
+
+
+class RecipeSearchTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.author_client = self.make_client(self.make_user('author'))
+        self.tag = Tag.objects.create(name='tag', slug='tag')
+        self.egg = Ingredient.objects.create(name='egg', measurement_unit='g')
+        self.rice = Ingredient.objects.create(
+            name='rice', measurement_unit='g'
+        )
+        self.omelette = self.create_recipe(
+            self.author_client, {self.egg: 3}, [self.tag],
+            name='Omelette', text='Beat eggs and fry',
+        )
+        self.pilaf = self.create_recipe(
+            self.author_client, {self.rice: 200}, [self.tag],
+            name='Pilaf with eggplant', text='Stew',
+        )
+
+    def search(self, query) -> list[int]:
+        response = self.request(
+            self.client, 'get', '/api/recipes/', {'search': query}
+        )
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_search_by_name_ingredients_and_text(self):
+        self.assertEqual(self.search('omelette'), [self.omelette])
+        self.assertEqual(self.search('RICE'), [self.pilaf])
+        self.assertEqual(self.search('fry'), [self.omelette])
+        # prefixes, all words
+        self.assertEqual(self.search('omel beat'), [self.omelette])
+        self.assertEqual(self.search('omelette stew'), [])
+        # name match ranks above ingredient and text matches
+        self.assertEqual(self.search('egg'), [self.pilaf, self.omelette])
+        # no words, no search
+        self.assertEqual(len(self.search('!')), 2)
+
+    def test_index_follows_changes(self):
+        self.request(
+            self.author_client, 'patch', f'/api/recipes/{self.omelette}/',
+            {
+                'name': 'Frittata',
+                'ingredients': [{'id': self.rice.id, 'amount': 1}],
+            },
+        )
+        self.assertEqual(self.search('omelette'), [])
+        self.assertEqual(self.search('frittata'), [self.omelette])
+        self.assertEqual(
+            sorted(self.search('rice')), sorted([self.omelette, self.pilaf])
+        )
+
+        self.rice.name = 'basmati'
+        self.commit(self.rice.save)
+        self.assertEqual(self.search('rice'), [])
+        self.assertEqual(len(self.search('basmati')), 2)
+
+        self.commit(Recipe.objects.get(pk=self.pilaf).delete)
+        self.assertEqual(self.search('basmati'), [self.omelette])
@@ -0,0 +1,118 @@
+import json
+
+from core.shopping_list import aggregate_shopping_lists
+from food.models import Ingredient, Recipe, ShoppingListItem, Tag
+
+from .base import APITestCase
+
+
+class ShoppingListTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = self.make_user('author')
+        self.author_client = self.make_client(self.author)
+        self.user = self.make_user('user')
+        self.user_client = self.make_client(self.user)
+        self.tag = Tag.objects.create(name='tag', slug='tag')
+        self.salt, self.egg, self.milk = [
+            Ingredient.objects.create(name=name, measurement_unit='g')
+            for name in ('salt', 'egg', 'milk')
+        ]
+        self.omelette = self.create_recipe(
+            self.author_client, {self.egg: 3, self.milk: 100, self.salt: 1},
+            [self.tag],
+        )
+        self.boiled_egg = self.create_recipe(
+            self.author_client, {self.egg: 2, self.salt: 1}, [self.tag]
+        )
+
+    def cart(self, method, recipe_id, client=None):
+        self.request(
+            client or self.user_client, method,
+            f'/api/recipes/{recipe_id}/shopping_cart/',
+        )
+
+    def download(self) -> dict:
+        response = self.request(
+            self.user_client, 'get',
+            '/api/recipes/download_shopping_cart/?file_format=json',
+        )
+        self.assertEqual(response.status_code, 200)
+        return {
+            item['name']: item['amount']
+            for item in json.loads(b''.join(response.streaming_content))
+        }
+
+    def assertListsMaintained(self):
+        expected = {
+            (item['user'], item['ingredient']): item['amount']
+            for item in aggregate_shopping_lists(
+                [self.user.pk, self.author.pk]
+            )
+        }
+        self.assertEqual(dict(
+            ((user_id, ingredient_id), amount)
+            for user_id, ingredient_id, amount
+            in ShoppingListItem.objects.values_list(
+                'user', 'ingredient', 'amount'
+            )
+        ), expected)
+
+    def test_cart_changes(self):
+        self.cart('post', self.omelette)
+        self.cart('post', self.boiled_egg)
+        self.cart('post', self.boiled_egg, self.author_client)
+        self.assertEqual(
+            self.download(), {'egg': 5, 'milk': 100, 'salt': 2}
+        )
+
+        self.cart('delete', self.omelette)
+        self.assertEqual(self.download(), {'egg': 2, 'salt': 1})
+        self.assertListsMaintained()
+
+        self.cart('delete', self.boiled_egg)
+        self.assertEqual(self.download(), {})
+        self.assertListsMaintained()
+
+    def test_recipe_changes(self):
+        self.cart('post', self.omelette)
+        self.cart('post', self.boiled_egg)
+
+        self.request(
+            self.author_client, 'patch', f'/api/recipes/{self.omelette}/',
+            {'ingredients': [
+                {'id': self.egg.id, 'amount': 4},
+                {'id': self.milk.id, 'amount': 100},
+            ]},
+        )
+        self.assertEqual(
+            self.download(), {'egg': 6, 'milk': 100, 'salt': 1}
+        )
+
+        self.commit(Recipe.objects.get(pk=self.boiled_egg).delete)
+        self.assertEqual(self.download(), {'egg': 4, 'milk': 100})
+        self.assertListsMaintained()
+
+    def test_formats(self):
+        self.cart('post', self.boiled_egg)
+
+        response = self.request(
+            self.user_client, 'get', '/api/recipes/download_shopping_cart/'
+        )
+        self.assertEqual(
+            b''.join(response.streaming_content).decode(),
+            'egg: 2 g.\nsalt: 1 g.\nEnjoy your lunch :)',
+        )
+        response = self.request(
+            self.user_client, 'get',
+            '/api/recipes/download_shopping_cart/?file_format=csv',
+        )
+        self.assertEqual(
+            b''.join(response.streaming_content).decode().splitlines(),
+            ['name,measurement_unit,amount', 'egg,g,2', 'salt,g,1'],
+        )
+        response = self.request(
+            self.user_client, 'get',
+            '/api/recipes/download_shopping_cart/?file_format=xml',
+        )
+        self.assertEqual(response.status_code, 400)
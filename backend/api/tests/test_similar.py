@@ -0,0 +1,103 @@
+import random
+
+from django.test import override_settings
+
+from core.similar import TAGS_WEIGHT, rebuild_similar
+from food.models import Ingredient, Recipe, SimilarRecipe, Tag
+
+from .base import APITestCase
+
+
+class SimilarRecipesTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = self.make_client(self.make_user('author'))
+        self.tags = [
+            Tag.objects.create(name=f'tag {i}', slug=f'tag{i}')
+            for i in range(3)
+        ]
+        self.ingredients = [
+            Ingredient.objects.create(name=f'ingredient {i}',
+                                      measurement_unit='g')
+            for i in range(6)
+        ]
+
+    def create(self, ingredients, tags) -> int:
+        return self.create_recipe(
+            self.client,
+            {self.ingredients[i]: 1 for i in ingredients},
+            [self.tags[i] for i in tags],
+        )
+
+    def similar(self, recipe_id) -> list[int]:
+        response = self.request(
+            self.client, 'get', f'/api/recipes/{recipe_id}/similar/'
+        )
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data]
+
+    def get_rows(self) -> set:
+        return {
+            (recipe_id, similar_id, round(score, 9))
+            for recipe_id, similar_id, score
+            in SimilarRecipe.objects.values_list(
+                'recipe', 'similar', 'score'
+            )
+        }
+
+    def test_closest_recipes_first(self):
+        query = self.create([0, 1, 2], [0])
+        close = self.create([0, 1, 2, 3], [0])
+        same_tags = self.create([0, 5], [0])
+        other_tags = self.create([0, 4], [1])
+        self.create([3, 4], [0])
+
+        self.assertEqual(self.similar(query), [close, same_tags, other_tags])
+        # cosine of ingredients and jaccard of tags
+        score = SimilarRecipe.objects.get(recipe=query, similar=close).score
+        self.assertAlmostEqual(
+            score, (1 - TAGS_WEIGHT) * 3 / 12 ** 0.5 + TAGS_WEIGHT
+        )
+
+        self.request(
+            self.client, 'patch', f'/api/recipes/{other_tags}/',
+            {'tags': [self.tags[0].id]},
+        )
+        # same scores, newer recipe first
+        self.assertEqual(self.similar(query), [close, other_tags, same_tags])
+
+        self.commit(Recipe.objects.get(pk=close).delete)
+        self.assertEqual(self.similar(query), [other_tags, same_tags])
+
+        response = self.request(
+            self.client, 'get', '/api/recipes/999/similar/'
+        )
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(SIMILAR_RECIPES=3)
+    def test_changes_equal_rebuild(self):
+        random.seed(1)
+        recipe_ids = [
+            self.create(
+                random.sample(range(6), random.randint(1, 4)),
+                random.sample(range(3), random.randint(1, 2)),
+            )
+            for _ in range(20)
+        ]
+        for recipe_id in recipe_ids[:5]:
+            self.request(
+                self.client, 'patch', f'/api/recipes/{recipe_id}/',
+                {'ingredients': [
+                    {'id': self.ingredients[i].id, 'amount': 1}
+                    for i in random.sample(range(6), random.randint(1, 4))
+                ]},
+            )
+        for recipe_id in recipe_ids[5:8]:
+            self.request(
+                self.client, 'delete', f'/api/recipes/{recipe_id}/'
+            )
+
+        rows = self.get_rows()
+        self.assertTrue(rows)
+        list(rebuild_similar())
+        self.assertEqual(self.get_rows(), rows)
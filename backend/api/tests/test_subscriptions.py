@@ -0,0 +1,62 @@
+from food.models import Recipe, Subscribe
+
+from .base import APITestCase
+
+
+class SubscriptionsTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('user')
+        self.user_client = self.make_client(self.user)
+
+    def add_authors(self, count, recipes=3):
+        authors = [
+            self.make_user(f'author{Subscribe.objects.count() + i}')
+            for i in range(count)
+        ]
+        Recipe.objects.bulk_create([
+            Recipe(
+                author=author, name=f'{author.username} {i}', text='text',
+                cooking_time=10, image='recipe.png',
+            )
+            for author in authors
+            for i in range(recipes)
+        ])
+        Subscribe.objects.bulk_create([
+            Subscribe(user=self.user, subscription=author)
+            for author in authors
+        ])
+        return authors
+
+    def get(self, query=''):
+        response = self.request(
+            self.user_client, 'get', f'/api/users/subscriptions/?{query}'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_latest_recipes_of_authors(self):
+        first, second = self.add_authors(2)
+
+        results = self.get('recipes_limit=2')
+        self.assertEqual(
+            [author['id'] for author in results], [second.pk, first.pk]
+        )
+        self.assertEqual(
+            [recipe['name'] for recipe in results[1]['recipes']],
+            ['author0 2', 'author0 1'],
+        )
+        self.assertTrue(results[0]['is_subscribed'])
+
+        self.assertEqual(len(self.get()[0]['recipes']), 3)
+        self.assertEqual(len(self.get('recipes_limit=0')[0]['recipes']), 0)
+
+    def test_queries_dont_depend_on_authors(self):
+        self.add_authors(2)
+        self.get('recipes_limit=2')
+        with self.assertNumQueries(3):
+            self.get('recipes_limit=2')
+
+        self.add_authors(10)
+        with self.assertNumQueries(3):
+            self.assertEqual(len(self.get('recipes_limit=2&limit=20')), 12)
@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.trending import recompute_scores
+from food.models import Favorite, Ingredient, Recipe, Tag
+
+from .base import APITestCase
+
+
+class TrendingTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        author_client = self.make_client(self.make_user('author'))
+        tag = Tag.objects.create(name='tag', slug='tag')
+        ingredient = Ingredient.objects.create(
+            name='ingredient', measurement_unit='g'
+        )
+        self.recipe_ids = [
+            self.create_recipe(author_client, {ingredient: 1}, [tag])
+            for _ in range(4)
+        ]
+        self.clients = [
+            self.make_client(self.make_user(f'user{i}')) for i in range(4)
+        ]
+        # anonymous lists are cached, order changes with every favorite
+        self.reader = self.make_client(self.make_user('reader'))
+
+    def trending(self, query='') -> list[int]:
+        response = self.request(
+            self.reader, 'get', f'/api/recipes/?ordering=trending{query}'
+        )
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def add(self, kind, recipe_id, clients):
+        for client in clients:
+            self.request(
+                client, 'post', f'/api/recipes/{recipe_id}/{kind}/'
+            )
+
+    def test_recent_favorites_and_carts_first(self):
+        first, second, third, fourth = self.recipe_ids
+        self.add('favorite', first, self.clients[:3])
+        # cart weighs two favorites
+        self.add('shopping_cart', second, self.clients[:2])
+        self.add('favorite', third, self.clients)
+        Favorite.objects.filter(recipe=third).update(
+            created=timezone.now() - timedelta(
+                seconds=settings.TRENDING_HALF_LIFE * 2
+            )
+        )
+        self.assertEqual(sum(recompute_scores()), 1)
+
+        self.assertEqual(self.trending(), [second, first, third, fourth])
+        # the same order in pages
+        pages = []
+        path = '/api/recipes/?ordering=trending&pagination=cursor&limit=1'
+        while path:
+            response = self.request(self.reader, 'get', path)
+            pages += [recipe['id'] for recipe in response.data['results']]
+            path = response.data['next']
+        self.assertEqual(pages, [second, first, third, fourth])
+
+        self.request(
+            self.clients[0], 'delete', f'/api/recipes/{second}/shopping_cart/'
+        )
+        self.assertEqual(self.trending(), [first, second, third, fourth])
+
+    def test_changes_equal_recompute(self):
+        self.add('favorite', self.recipe_ids[0], self.clients)
+        self.add('shopping_cart', self.recipe_ids[0], self.clients[:2])
+        self.request(
+            self.clients[1], 'post', '/api/recipes/favorite/',
+            {'recipes': self.recipe_ids},
+        )
+        self.request(
+            self.clients[0], 'delete', '/api/recipes/favorite/',
+            {'recipes': self.recipe_ids},
+        )
+        self.request(
+            self.clients[1], 'delete', '/api/recipes/favorite/',
+            {'recipes': self.recipe_ids[2:]},
+        )
+        for client in self.clients:
+            self.request(
+                client, 'delete',
+                f'/api/recipes/{self.recipe_ids[0]}/shopping_cart/',
+            )
+
+        scores = dict(Recipe.objects.values_list('pk', 'score'))
+        self.assertEqual(sum(recompute_scores()), 0)
+        # recipes without favorites and carts have the same score
+        self.assertEqual(
+            {scores[pk] for pk in self.recipe_ids[2:]},
+            {Recipe._meta.get_field('score').default},
+        )
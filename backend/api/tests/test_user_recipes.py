@@ -0,0 +1,118 @@
+from food.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+
+from .base import APITestCase
+
+
+class UserRecipesTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user('user')
+        self.client = self.make_client(self.user)
+        tag = Tag.objects.create(name='tag', slug='tag')
+        ingredient = Ingredient.objects.create(
+            name='ingredient', measurement_unit='g'
+        )
+        self.recipe_ids = [
+            self.create_recipe(self.client, {ingredient: amount}, [tag])
+            for amount in (1, 2, 3)
+        ]
+
+    def test_single_changes_are_idempotent(self):
+        path = f'/api/recipes/{self.recipe_ids[0]}/favorite/'
+
+        for status in (201, 200):
+            response = self.request(self.client, 'post', path)
+            self.assertEqual(response.status_code, status)
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe_ids[0]).favorites_count, 1
+        )
+
+        for _ in range(2):
+            response = self.request(self.client, 'delete', path)
+            self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe_ids[0]).favorites_count, 0
+        )
+
+        for method in ('post', 'delete'):
+            response = self.request(
+                self.client, method, '/api/recipes/999999/favorite/'
+            )
+            self.assertEqual(response.status_code, 404)
+
+    def test_bulk_changes(self):
+        path = '/api/recipes/shopping_cart/'
+
+        response = self.request(
+            self.client, 'post', path, {'recipes': self.recipe_ids[:2]}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['added'], self.recipe_ids[:2])
+
+        response = self.request(
+            self.client, 'post', path, {'recipes': self.recipe_ids}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['added'], self.recipe_ids[2:])
+        response = self.request(
+            self.client, 'post', path, {'recipes': self.recipe_ids}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['added'], [])
+
+        self.assertEqual(
+            Recipe.objects.filter(shopping_carts_count=1).count(), 3
+        )
+        response = self.request(
+            self.client, 'get', '/api/recipes/download_shopping_cart/'
+        )
+        self.assertEqual(
+            b''.join(response.streaming_content).decode().splitlines()[0],
+            'ingredient: 6 g.',
+        )
+
+        response = self.request(
+            self.client, 'delete', path, {'recipes': self.recipe_ids[1:]}
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            list(ShoppingCart.objects.values_list('recipe', flat=True)),
+            self.recipe_ids[:1],
+        )
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe_ids[1]).shopping_carts_count, 0
+        )
+
+    def test_bulk_add_with_unknown_recipe_adds_nothing(self):
+        response = self.request(
+            self.client, 'post', '/api/recipes/favorite/',
+            {'recipes': [self.recipe_ids[0], 999999]},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Favorite.objects.exists())
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe_ids[0]).favorites_count, 0
+        )
+
+        for data in ({}, {'recipes': []}, {'recipes': ['a']}):
+            response = self.request(
+                self.client, 'post', '/api/recipes/favorite/', data
+            )
+            self.assertEqual(response.status_code, 400, data)
+
+    def test_flags_and_filters(self):
+        self.request(
+            self.client, 'post', '/api/recipes/favorite/',
+            {'recipes': self.recipe_ids[1:]},
+        )
+
+        response = self.request(
+            self.client, 'get', '/api/recipes/?is_favorited=1'
+        )
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            self.recipe_ids[:0:-1],
+        )
+        self.assertTrue(all(
+            recipe['is_favorited'] for recipe in response.data['results']
+        ))
@@ -5,20 +5,22 @@ from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 from rest_framework.routers import DefaultRouter as Router
 
-from api.views import (FavoriteViewSet, GetSubscriptions, IngredientViewSet,
-                       RecipeViewSet, ShoppingCartViewSet, SubscribeViewSet,
-                       TagViewSet)
+from api.views import (ExportJobViewSet, FavoriteViewSet, GetSubscriptions,
+                       IngredientViewSet, RecipeViewSet, ShoppingCartViewSet,
+                       SubscribeViewSet, TagViewSet)
 
 router = Router()
 router.register('tags', TagViewSet, basename='tags')
+# before recipes, so recipes/favorite/ isn't taken for recipe detail
 router.register('recipes', ShoppingCartViewSet, basename='shoppingcarts')
-router.register('recipes', RecipeViewSet, basename='recipes')
 router.register('recipes', FavoriteViewSet, basename='favorites')
+router.register('recipes', RecipeViewSet, basename='recipes')
 router.register('ingredients', IngredientViewSet, basename='ingredients')
 router.register('users', SubscribeViewSet, basename='subscribes')
 router.register(
     'users/subscriptions', GetSubscriptions, basename='subscriptions'
 )
+router.register('exports', ExportJobViewSet, basename='exports')
 
 
 urlpatterns = [
@@ -1,45 +1,145 @@
-from django.db import models
-from django.http import FileResponse
+from django.db import transaction
+from django.db.models import BooleanField, Exists, OuterRef, Prefetch, Value
+from django.http import FileResponse, Http404
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework import filters, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import (IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
-from rest_framework.status import HTTP_201_CREATED, HTTP_204_NO_CONTENT
-
-from core.make_shopping_file import make_shopping_file
-from core.pagination import StandardResultsSetPagination
-
-from food.models import (Favorite, Ingredient, Recipe, ShoppingCart, Subscribe,
-                         Tag)
+from rest_framework.status import (HTTP_200_OK, HTTP_201_CREATED,
+                                   HTTP_202_ACCEPTED, HTTP_204_NO_CONTENT)
+
+from core.autocomplete import get_autocomplete_index
+from core.cache import (INGREDIENTS_VERSION, RECIPES_LIST_VERSION,
+                        TAGS_VERSION, AnonymousResponseCacheMixin,
+                        recipe_version_key, viewer_version_key)
+from core.catalog import (CatalogViewSetMixin, ingredients_snapshot,
+                          tags_snapshot)
+from core.conditional import ConditionalGetMixin
+from core.exports import start_export
+from core.feed import FeedPagination
+from core.make_shopping_file import FILE_FORMATS, make_shopping_file
+from core.pagination import CursorSwitchPagination
+from core.prefetch import prefetch_top_recipes
+from core.user_recipes import add_recipes, remove_recipes
+
+from food.models import (Favorite, Ingredient, IngredientAmount, Recipe,
+                         ShoppingCart, SimilarRecipe, Subscribe, Tag)
 from users.models import User
 
 from .filters import FilterRecipe, IngredientFilter
 from .permissions import IsAuthorOrReadOnly
-from .serializers import (CreateFavoriteRecipeSerializer,
-                          CreateShoppingCartRecipeSerializer,
-                          GetRecipeSerializer, IngredientSerializer,
-                          RecipeSerializer, SubscribeSerializer, TagSerializer,
+from .serializers import (ExportJobSerializer, GetRecipeSerializer,
+                          IngredientSerializer, RecipeIdsSerializer,
+                          RecipeSerializer, SubscribeRecipeSerializer,
+                          SubscribeSerializer, TagSerializer,
                           UserGetSubscribeSerializer)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(
+    ConditionalGetMixin, CatalogViewSetMixin, viewsets.ReadOnlyModelViewSet
+):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = [IngredientFilter]
     search_fields = ('^name',)
-
-
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+    catalog = ingredients_snapshot
+    catalog_search_param = IngredientFilter.search_param
+    autocomplete_limit = 10
+    autocomplete_max_limit = 100
+
+    @action(["get"], detail=False)
+    def autocomplete(self, request):
+        # prefix and substring matches, filled up with popular ingredients
+        try:
+            limit = int(request.query_params['limit'])
+        except (KeyError, ValueError):
+            limit = self.autocomplete_limit
+        limit = max(1, min(limit, self.autocomplete_max_limit))
+
+        snapshot = self.catalog.get()
+        ids = get_autocomplete_index().search(
+            request.query_params.get(self.catalog_search_param, ''),
+            limit,
+            fill_popular=True,
+        )
+        return Response(
+            [snapshot.by_id[pk] for pk in ids if pk in snapshot.by_id]
+        )
+
+    def get_cache_versions(self):
+        return (INGREDIENTS_VERSION,)
+
+
+class TagViewSet(
+    ConditionalGetMixin, CatalogViewSetMixin, viewsets.ReadOnlyModelViewSet
+):
     queryset = Tag.objects.all()
     lookup_field = 'id'
     serializer_class = TagSerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ('^name',)
+    catalog = tags_snapshot
+
+    def get_cache_versions(self):
+        return (TAGS_VERSION,)
+
+
+class UserRecipesViewSet(viewsets.ViewSet):
+    """
+    Favorites or shopping cart (model) of user. Adding recipe which is
+    there and removing recipe which isn't do nothing.
+    """
+
+    model = None
+
+    def change_recipe(self, request, pk):
+        try:
+            pk = int(pk)
+        except ValueError:
+            raise Http404
+
+        if request.method == "POST":
+            added, unknown = add_recipes(self.model, request.user, [pk])
+            if unknown:
+                raise Http404
+            return Response(
+                data=request.data,
+                status=HTTP_201_CREATED if added else HTTP_200_OK,
+            )
+
+        if not remove_recipes(self.model, request.user, [pk]):
+            get_object_or_404(Recipe.objects.only('pk'), id=pk)
+        return Response(data=request.data, status=HTTP_204_NO_CONTENT)
+
+    def change_recipes(self, request):
+        # {"recipes": [id, ...]}
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+
+        if request.method == "POST":
+            added, unknown = add_recipes(self.model, request.user, recipe_ids)
+            if unknown:
+                raise ValidationError({'recipes': [
+                    f'Invalid pk "{pk}" - object does not exist.'
+                    for pk in unknown
+                ]})
+            return Response(
+                data={'added': added},
+                status=HTTP_201_CREATED if added else HTTP_200_OK,
+            )
 
+        remove_recipes(self.model, request.user, recipe_ids)
+        return Response(status=HTTP_204_NO_CONTENT)
+
+
+class FavoriteViewSet(UserRecipesViewSet):
+    model = Favorite
 
-class FavoriteViewSet(viewsets.ViewSet):
     @action(
         ["post", "delete"],
         detail=True,
@@ -47,26 +147,22 @@ class FavoriteViewSet(viewsets.ViewSet):
         permission_classes=(IsAuthenticated,)
     )
     def favorite(self, request, pk):
-        user = request.user
-        recipe = get_object_or_404(Recipe, id=pk)
+        return self.change_recipe(request, pk)
 
-        if request.method == "POST":
-
-            serializer = CreateFavoriteRecipeSerializer(
-                recipe, data=request.data, context={'request': request}
-            )
-            serializer.is_valid(raise_exception=True)
-
-            Favorite.objects.create(user=user, recipe=recipe)
-            return Response(data=request.data, status=HTTP_201_CREATED)
+    @action(
+        ["post", "delete"],
+        detail=False,
+        url_path='favorite',
+        url_name='bulk-favorite',
+        permission_classes=(IsAuthenticated,)
+    )
+    def favorites(self, request):
+        return self.change_recipes(request)
 
-        # delete favorite
-        favorite = get_object_or_404(Favorite, user=user, recipe=recipe)
-        favorite.delete()
-        return Response(data=request.data, status=HTTP_204_NO_CONTENT)
 
+class ShoppingCartViewSet(UserRecipesViewSet):
+    model = ShoppingCart
 
-class ShoppingCartViewSet(viewsets.ViewSet):
     @action(
         ["post", "delete"],
         True,
@@ -74,23 +170,17 @@ class ShoppingCartViewSet(viewsets.ViewSet):
         permission_classes=(IsAuthenticated,)
     )
     def shopping(self, request, pk):
-        user = request.user
-        recipe = get_object_or_404(Recipe, id=pk)
-
-        if request.method == "POST":
-
-            serializer = CreateShoppingCartRecipeSerializer(
-                recipe, data=request.data, context={'request': request}
-            )
-            serializer.is_valid(raise_exception=True)
+        return self.change_recipe(request, pk)
 
-            ShoppingCart.objects.create(user=user, recipe=recipe)
-            return Response(data=request.data, status=HTTP_201_CREATED)
-
-        # delete recipe from shopping cart
-        recipe = get_object_or_404(ShoppingCart, user=user, recipe=recipe)
-        recipe.delete()
-        return Response(data=request.data, status=HTTP_204_NO_CONTENT)
+    @action(
+        ["post", "delete"],
+        detail=False,
+        url_path='shopping_cart',
+        url_name='bulk-shopping-cart',
+        permission_classes=(IsAuthenticated,)
+    )
+    def shopping_many(self, request):
+        return self.change_recipes(request)
 
     @action(
         ["get"],
@@ -100,33 +190,145 @@ class ShoppingCartViewSet(viewsets.ViewSet):
         permission_classes=(IsAuthenticated,)
     )
     def download_shopping_cart(self, request):
-        # Return txt file with list of needs ingredients
-        cart = ShoppingCart.objects.filter(user=request.user)
-        return FileResponse(make_shopping_file(cart))
+        # Return txt, csv or json file with list of needs ingredients
+        file_format = request.query_params.get('file_format', 'txt')
+        if file_format not in FILE_FORMATS:
+            raise ValidationError(
+                {'file_format': f'Choose one of: {", ".join(FILE_FORMATS)}'}
+            )
 
+        return make_shopping_file(request.user, file_format)
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+class RecipeViewSet(
+    ConditionalGetMixin, AnonymousResponseCacheMixin, viewsets.ModelViewSet
+):
     queryset = Recipe.objects.all()
     filterset_class = FilterRecipe
     permission_classes = (IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly,)
-    pagination_class = StandardResultsSetPagination
+    pagination_class = CursorSwitchPagination
     http_method_names = ["get", 'post', 'patch', 'delete']
 
+    @property
+    def keyset_ordering(self):
+        if self.request.query_params.get('ordering') == 'trending':
+            return ('-score', '-id')
+        return ('-created', '-id')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+
+        if self.request.method != 'GET':
+            return queryset.select_related('author')
+
+        # load only what will be serialized
+        fields = GetRecipeSerializer.get_requested_fields(self.request)
+
+        if 'author' in fields:
+            queryset = queryset.select_related('author')
+        if 'tags' in fields:
+            queryset = queryset.prefetch_related('tags')
+        if 'ingredients' in fields:
+            queryset = queryset.prefetch_related(Prefetch(
+                'ingredients',
+                queryset=IngredientAmount.objects.select_related('ingredient')
+            ))
+        deferred = {'text', 'image_variants'} - set(fields)
+        if deferred:
+            queryset = queryset.defer(*deferred)
+
+        return queryset.annotate(**self.get_viewer_annotations(fields))
+
+    def get_viewer_annotations(self, fields):
+        user = self.request.user
+
+        # anonymous viewer can't have favorites, cart or subscriptions
+        if not user.is_authenticated:
+            return {}
+
+        annotations = {}
+
+        if 'is_favorited' in fields:
+            annotations['is_favorited'] = Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+            )
+        if 'is_in_shopping_cart' in fields:
+            annotations['is_in_shopping_cart'] = Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+            )
+        if 'author' in fields:
+            annotations['author_is_subscribed'] = Exists(
+                Subscribe.objects.filter(
+                    user=user, subscription=OuterRef('author')
+                )
+            )
+
+        return annotations
+
+    def get_cache_versions(self):
+        if self.lookup_field in self.kwargs:
+            versions = (recipe_version_key(self.kwargs[self.lookup_field]),)
+        else:
+            versions = (RECIPES_LIST_VERSION,)
+
+        # favorites, cart and subscriptions flags depend on viewer
+        if self.request.user.is_authenticated:
+            versions += (viewer_version_key(self.request.user.id),)
+
+        return versions
+
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
+
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return GetRecipeSerializer
 
         return RecipeSerializer
 
+    @action(
+        ["get"],
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        pagination_class=FeedPagination,
+    )
+    def feed(self, request):
+        """Recipes of followed authors, newest first."""
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(["get"], detail=True)
+    def similar(self, request, pk):
+        """Precomputed closest recipes by ingredients and tags."""
+        ids = list(SimilarRecipe.objects.filter(recipe=pk).order_by(
+            '-score', '-similar_id'
+        ).values_list('similar', flat=True))
+        if not ids:
+            get_object_or_404(Recipe, pk=pk)
+
+        recipes = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in ids if pk in recipes], many=True
+        )
+        return Response(serializer.data)
+
 
 class GetSubscriptions(
     viewsets.mixins.ListModelMixin, viewsets.GenericViewSet
 ):
     permission_classes = (IsAuthenticated,)
-    pagination_class = StandardResultsSetPagination
+    pagination_class = CursorSwitchPagination
+    keyset_ordering = ('-id',)
     filter_backends = (filters.SearchFilter,)
     serializer_class = UserGetSubscribeSerializer
 
@@ -135,16 +337,30 @@ class GetSubscriptions(
 
         subscription_users = User.objects.filter(
             subscribers__user=user
-        ).annotate(recipes_count=models.Count('recipes'))
+        ).annotate(is_subscribed=Value(True, output_field=BooleanField()))
 
         return subscription_users
 
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+
+        if page is not None:
+            # recipes of all authors on the page in one query
+            prefetch_top_recipes(
+                page,
+                UserGetSubscribeSerializer.get_recipes_limit(self.request),
+                fields=SubscribeRecipeSerializer.Meta.fields,
+            )
+
+        return page
+
     class Meta:
         ordering = ['-id']
 
 
 class SubscribeViewSet(viewsets.ViewSet):
     @action(["post", "delete"], detail=True, url_path='subscribe')
+    @transaction.atomic
     def subscribe(self, request, pk):
         user = request.user
         sub = get_object_or_404(User, id=pk)
@@ -169,3 +385,42 @@ class SubscribeViewSet(viewsets.ViewSet):
         sub = get_object_or_404(Subscribe, user=user, subscription=sub)
         sub.delete()
         return Response(data=request.data, status=HTTP_204_NO_CONTENT)
+
+
+class ExportJobViewSet(
+    viewsets.mixins.CreateModelMixin,
+    viewsets.mixins.ListModelMixin,
+    viewsets.mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
+):
+    # create export, poll its status and download finished file
+    serializer_class = ExportJobSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = CursorSwitchPagination
+
+    def get_queryset(self):
+        return self.request.user.export_jobs.all()
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        job = start_export(request.user, **serializer.validated_data)
+        return Response(
+            self.get_serializer(job).data, status=HTTP_202_ACCEPTED
+        )
+
+    @action(["get"], detail=True)
+    def download(self, request, pk):
+        job = self.get_object()
+
+        if job.status != job.DONE or not job.file:
+            raise Http404('Export is not finished')
+        if job.expires < timezone.now():
+            raise Http404('Export is expired')
+
+        return FileResponse(
+            job.file.open('rb'),
+            as_attachment=True,
+            filename=job.file.name.split('/')[-1],
+        )
@@ -89,6 +89,70 @@ DATABASES = {
     }[DATABASE]
 }
 
+# Shared by all gunicorn workers: versions bumped by one worker must be
+# seen by others. File-based by default, memcached or redis in
+# production; local memory cache is for one process only (gunicorn
+# doesn't start several workers with it)
+CACHES = {
+    'default': {
+        'BACKEND': env(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': env('CACHE_LOCATION', '/tmp/foodgram_cache'),
+    }
+}
+
+# seconds, 0 disables anonymous responses cache
+RESPONSE_CACHE_TIMEOUT = int(env('RESPONSE_CACHE_TIMEOUT', 60 * 5))
+# share of anonymous requests counted in hits and misses of responses
+# cache for `manage.py cache_stats`, 0 - disabled. Every counted request
+# makes two more cache round-trips, counts are approximate with
+# file-based cache (its incr isn't atomic)
+RESPONSE_CACHE_STATS_RATE = float(env('RESPONSE_CACHE_STATS_RATE', 0))
+
+# seconds and number of tokens cached by authentication in every worker
+AUTH_CACHE_TIMEOUT = int(env('AUTH_CACHE_TIMEOUT', 60))
+AUTH_CACHE_SIZE = 10000
+
+# seconds between recounts of ingredients popularity for autocomplete
+AUTOCOMPLETE_POPULARITY_TIMEOUT = 60 * 60
+
+# threads for background tasks in every worker, 0 - tasks run in
+# request after commit. SQLite allows one writer and a transaction of
+# request fails to get the lock held by a thread, so with SQLite image
+# variants, exports and similar recipes are made inline and make the
+# request slower
+BACKGROUND_WORKERS = int(env(
+    'BACKGROUND_WORKERS', 0 if DATABASE == 'SQLITE' else 2
+))
+
+# seconds before finished export is deleted
+EXPORT_TIMEOUT = int(env('EXPORT_TIMEOUT', 60 * 60 * 24))
+# seconds between deletions of expired exports by `manage.py exports -i`
+EXPORT_CLEAN_INTERVAL = int(env('EXPORT_CLEAN_INTERVAL', 60 * 10))
+
+# authors with fewer followers write new recipes to followers' feeds,
+# feeds read recipes of other authors
+FEED_FANOUT_LIMIT = int(env('FEED_FANOUT_LIMIT', 1000))
+# recipes of author added to feed on subscribe
+FEED_BACKFILL_RECIPES = 100
+
+# PostgreSQL text search configuration of recipes search
+SEARCH_CONFIG = env('SEARCH_CONFIG', 'russian')
+
+# "cook with what I have" filter of recipes
+MAX_MISSING_INGREDIENTS = 5
+MAX_INGREDIENTS_SEARCH_RESULTS = 1000
+
+# recipes added to favorites or shopping cart by one request
+MAX_BULK_RECIPES = 100
+
+# neighbours of recipe in /recipes/{id}/similar/
+SIMILAR_RECIPES = 10
+
+# seconds, favorites and carts of recipe weigh half as much after it
+TRENDING_HALF_LIFE = int(env('TRENDING_HALF_LIFE', 60 * 60 * 24 * 7))
 
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 3000
 
@@ -109,7 +173,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
@@ -161,6 +225,8 @@ STATIC_ROOT = BASE_DIR / 'collected_static'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'backend_static' / 'static' / 'media'
+# files of users, not served by nginx, only by views checking access
+PRIVATE_MEDIA_ROOT = Path(env('PRIVATE_MEDIA_ROOT', BASE_DIR / 'private_media'))
 
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -0,0 +1,104 @@
+import heapq
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db.models import Count
+
+from food.models import IngredientAmount
+
+from .catalog import ingredients_snapshot
+
+
+def normalize(name: str) -> str:
+    return ' '.join(name.casefold().replace('ё', 'е').split())
+
+
+class AutocompleteIndex:
+    """
+    Sorted normalized names: prefix matches are found by binary search,
+    substring matches by scan of names. Inside each group more popular
+    ingredients go first.
+    """
+
+    def __init__(self, items, popularity):
+        entries = sorted(
+            (normalize(item['name']), item['id']) for item in items
+        )
+        self.names = [name for name, _ in entries]
+        self.ids = [item_id for _, item_id in entries]
+        self.popularity = popularity
+        self.popular_ids = sorted(
+            self.ids, key=lambda item_id: -popularity.get(item_id, 0)
+        )
+
+    def rank(self, positions, limit):
+        key = (
+            lambda position:
+            (-self.popularity.get(self.ids[position], 0), position)
+        )
+        if limit is None:
+            return sorted(positions, key=key)
+
+        return heapq.nsmallest(limit, positions, key=key)
+
+    def search(self, query, limit=None, fill_popular=False) -> list[int]:
+        """Return ids: prefix matches, substring matches, popular."""
+        query = normalize(query)
+
+        start = bisect_left(self.names, query)
+        end = bisect_left(self.names, query + '\uffff', lo=start)
+        result = [
+            self.ids[position]
+            for position in self.rank(range(start, end), limit)
+        ]
+
+        if query and (limit is None or len(result) < limit):
+            substring = (
+                position for position, name in enumerate(self.names)
+                if query in name and not name.startswith(query)
+            )
+            rest = None if limit is None else limit - len(result)
+            result += [
+                self.ids[position] for position in self.rank(substring, rest)
+            ]
+
+        if fill_popular and limit is not None and len(result) < limit:
+            found = set(result)
+            result += [
+                item_id for item_id in self.popular_ids[:limit]
+                if item_id not in found
+            ][:limit - len(result)]
+
+        return result
+
+
+# per-process index, rebuilt on new ingredients version
+# or when popularity is outdated
+autocomplete = {'version': None, 'built': 0, 'index': None}
+
+
+def get_popularity() -> dict:
+    # {ingredient id: number of recipes with it}
+    return dict(
+        IngredientAmount.objects.values('ingredient').annotate(
+            count=Count('recipe')
+        ).values_list('ingredient', 'count')
+    )
+
+
+def get_autocomplete_index() -> AutocompleteIndex:
+    snapshot = ingredients_snapshot.get()
+    outdated = (
+        time.monotonic() - autocomplete['built']
+        > settings.AUTOCOMPLETE_POPULARITY_TIMEOUT
+    )
+
+    if autocomplete['version'] != snapshot.version or outdated:
+        autocomplete['index'] = AutocompleteIndex(
+            snapshot.items, get_popularity()
+        )
+        autocomplete['version'] = snapshot.version
+        autocomplete['built'] = time.monotonic()
+
+    return autocomplete['index']
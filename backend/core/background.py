@@ -0,0 +1,81 @@
+import logging
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# batches of run_once_on_commit by connection, connections are per thread
+pending_batches = weakref.WeakKeyDictionary()
+
+# threads are started by the first task, so every gunicorn worker
+# has its own pool after fork; without workers tasks run inline
+executor = ThreadPoolExecutor(
+    max_workers=settings.BACKGROUND_WORKERS,
+    thread_name_prefix='background',
+) if settings.BACKGROUND_WORKERS else None
+
+
+def call(function, *args):
+    try:
+        function(*args)
+    except Exception:
+        logger.exception('background task %s failed', function.__name__)
+
+
+def run_task(function, *args):
+    try:
+        call(function, *args)
+    finally:
+        # thread has its own database connections
+        connections.close_all()
+
+
+def submit(function, *args):
+    if executor is None:
+        # in the thread of request: tests, SQLite with one writer
+        call(function, *args)
+    else:
+        executor.submit(run_task, function, *args)
+
+
+def run_in_background(function, *args):
+    # after commit, so task sees rows saved by the request
+    transaction.on_commit(lambda: submit(function, *args))
+
+
+def get_pending() -> dict:
+    # {(function, in background): ids} of transaction of the thread,
+    # ids of a rolled back one are left to the next commit and make
+    # only extra work
+    return pending_batches.setdefault(transaction.get_connection(), {})
+
+
+def run_pending(pending):
+    batches = list(pending.items())
+    pending.clear()
+    # functions run in request before tasks are submitted, so tasks
+    # see indexes they update
+    for (function, background), ids in sorted(
+        batches, key=lambda batch: batch[0][1]
+    ):
+        if background:
+            submit(function, ids)
+        else:
+            function(ids)
+
+
+def run_once_on_commit(function, ids, background=False):
+    """
+    Run function(ids) after commit once per transaction, with ids of
+    all calls made in it. The first hook run after commit runs all.
+    """
+    pending = get_pending()
+    pending.setdefault((function, background), set()).update(ids)
+    transaction.on_commit(lambda: run_pending(pending))
+
+
+def run_once_in_background(function, ids):
+    run_once_on_commit(function, ids, background=True)
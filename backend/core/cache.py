@@ -0,0 +1,157 @@
+import hashlib
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+RECIPES_LIST_VERSION = 'version:recipes'
+TAGS_VERSION = 'version:tags'
+INGREDIENTS_VERSION = 'version:ingredients'
+RESPONSE_CACHE_HITS = 'response_cache:hits'
+RESPONSE_CACHE_MISSES = 'response_cache:misses'
+
+
+def recipe_version_key(recipe_id) -> str:
+    return f'version:recipe:{recipe_id}'
+
+
+def viewer_version_key(user_id) -> str:
+    # favorites, shopping cart and subscriptions of the user
+    return f'version:viewer:{user_id}'
+
+
+def get_versions(*keys) -> list:
+    """
+    Return current value of every version counter.
+    Version is time of the last change in nanoseconds, missing
+    (new or evicted) counter starts from current time,
+    so it never repeats a value which was used before.
+    """
+    versions = cache.get_many(keys)
+
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*keys):
+    # bump after commit, otherwise concurrent request may cache
+    # old data under the new version
+    transaction.on_commit(
+        lambda: cache.set_many(dict.fromkeys(keys, time.time_ns()), None)
+    )
+
+
+def invalidate_recipes(*recipe_ids):
+    bump_versions(
+        RECIPES_LIST_VERSION,
+        *[recipe_version_key(recipe_id) for recipe_id in recipe_ids]
+    )
+
+
+def get_cache_stats() -> dict:
+    stats = cache.get_many((RESPONSE_CACHE_HITS, RESPONSE_CACHE_MISSES))
+    hits = stats.get(RESPONSE_CACHE_HITS, 0)
+    misses = stats.get(RESPONSE_CACHE_MISSES, 0)
+
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / (hits + misses) if hits + misses else 0,
+    }
+
+
+def reset_cache_stats():
+    cache.delete_many((RESPONSE_CACHE_HITS, RESPONSE_CACHE_MISSES))
+
+
+def count_cache_request(key):
+    # sampled, hit rate doesn't depend on the rate
+    if random.random() >= settings.RESPONSE_CACHE_STATS_RATE:
+        return
+
+    if not cache.add(key, 1, None):
+        cache.incr(key)
+
+
+class VersionedResponseMixin:
+    """
+    Responses of view depend on query string and version counters from
+    `get_cache_versions`, bump of a version changes them.
+    """
+
+    def get_cache_versions(self):
+        raise NotImplementedError
+
+    def read_cache_versions(self):
+        # once per request, shared by cache and validators
+        if not hasattr(self, '_cache_versions'):
+            self._cache_versions = get_versions(*self.get_cache_versions())
+        return self._cache_versions
+
+    def get_normalized_query(self, request):
+        # order of parameters and of their values doesn't matter
+        return sorted(
+            (key, sorted(values))
+            for key, values in request.query_params.lists()
+        )
+
+
+class AnonymousResponseCacheMixin(VersionedResponseMixin):
+    """
+    Cache list and retrieve responses for anonymous users.
+    Key contains normalized query string and versions, so bump of
+    a version drops related entries.
+    """
+
+    response_cache_timeout = settings.RESPONSE_CACHE_TIMEOUT
+
+    def get_response_cache_key(self, request):
+        raw_key = ':'.join(map(str, (
+            request.get_host(),
+            request.path,
+            self.get_normalized_query(request),
+            self.read_cache_versions(),
+        )))
+        return 'response:' + hashlib.md5(raw_key.encode()).hexdigest()
+
+    def cached_response(self, request, get_response):
+        if request.user.is_authenticated or not self.response_cache_timeout:
+            return get_response()
+
+        key = self.get_response_cache_key(request)
+        data = cache.get(key)
+
+        if data is not None:
+            count_cache_request(RESPONSE_CACHE_HITS)
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        count_cache_request(RESPONSE_CACHE_MISSES)
+        response = get_response()
+        if response.status_code == 200:
+            cache.set(key, response.data, self.response_cache_timeout)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, lambda: super(AnonymousResponseCacheMixin, self).list(
+                request, *args, **kwargs
+            )
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request,
+            lambda: super(AnonymousResponseCacheMixin, self).retrieve(
+                request, *args, **kwargs
+            )
+        )
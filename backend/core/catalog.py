@@ -0,0 +1,123 @@
+import json
+
+from django.http import HttpResponse
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+from food.models import Ingredient, Tag
+
+from .cache import INGREDIENTS_VERSION, TAGS_VERSION, get_versions
+
+
+class CatalogSnapshot:
+    """
+    Per-process copy of a near-static catalog with pre-serialized JSON.
+    Reloaded when version of the catalog changes.
+    """
+
+    def __init__(self, version_key, queryset, fields):
+        self.version_key = version_key
+        self.queryset = queryset
+        self.fields = fields
+        self.version = None
+        self.items = []
+        self.by_id = {}
+        self.indexes = {}
+        self.json = b'[]'
+
+    def __deepcopy__(self, memo):
+        # one per process, serializer fields deep copy their arguments
+        return self
+
+    def get(self):
+        version, = get_versions(self.version_key)
+
+        # version is read before loading, so catalog changed meanwhile
+        # is reloaded by the next call
+        if self.version != version:
+            self.load()
+            self.version = version
+
+        return self
+
+    def load(self):
+        items = list(self.queryset.all().values(*self.fields))
+
+        self.by_id = {item['id']: item for item in items}
+        self.indexes = {}
+        # same output as rest_framework JSONRenderer
+        self.json = json.dumps(
+            items, ensure_ascii=False, separators=(',', ':')
+        ).encode()
+        self.items = items
+
+    def get_index(self, field) -> dict:
+        # {value of field: id}, built once per version
+        if field not in self.indexes:
+            self.indexes[field] = {
+                item[field]: item['id'] for item in self.items
+            }
+        return self.indexes[field]
+
+
+tags_snapshot = CatalogSnapshot(
+    TAGS_VERSION, Tag.objects.order_by('id'), ('id', 'name', 'color', 'slug')
+)
+ingredients_snapshot = CatalogSnapshot(
+    INGREDIENTS_VERSION,
+    Ingredient.objects.order_by('id'),
+    ('id', 'name', 'measurement_unit'),
+)
+
+
+def warm_up():
+    tags_snapshot.get()
+    ingredients_snapshot.get()
+
+
+def get_tag_ids_by_slug() -> dict:
+    return tags_snapshot.get().get_index('slug')
+
+
+def get_tag_choices() -> list:
+    return [(slug, slug) for slug in get_tag_ids_by_slug()]
+
+
+class CatalogViewSetMixin:
+    """
+    Serve list and retrieve of read only catalog from `catalog` snapshot
+    without database queries. Unfiltered JSON list is sent as is.
+    """
+
+    catalog = None
+    catalog_search_param = 'search'
+
+    def list(self, request, *args, **kwargs):
+        snapshot = self.catalog.get()
+        search = request.query_params.get(self.catalog_search_param)
+
+        if search:
+            return Response(self.search(snapshot, search))
+
+        if request.accepted_renderer.format == 'json':
+            return HttpResponse(
+                snapshot.json, content_type='application/json'
+            )
+
+        return Response(snapshot.items)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+
+        try:
+            return Response(self.catalog.get().by_id[int(lookup)])
+        except (KeyError, ValueError):
+            raise NotFound
+
+    def search(self, snapshot, search):
+        # name starts with search, like SearchFilter '^name'
+        search = search.casefold()
+        return [
+            item for item in snapshot.items
+            if item['name'].casefold().startswith(search)
+        ]
@@ -0,0 +1,59 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from .cache import VersionedResponseMixin
+
+
+class ConditionalGetMixin(VersionedResponseMixin):
+    """
+    ETag and Last-Modified for list and retrieve.
+    Validators are built from version counters, so 304 answer needs
+    neither queries nor serialization.
+    """
+
+    def get_validators(self, request):
+        versions = self.read_cache_versions()
+        raw_etag = ':'.join(map(str, (
+            request.path,
+            self.get_normalized_query(request),
+            request.accepted_media_type,
+            request.user.id,
+            versions,
+        )))
+        etag = '"%s"' % hashlib.md5(raw_etag.encode()).hexdigest()
+        # version is time of the last change in nanoseconds
+        last_modified = max(versions) // 10 ** 9
+
+        return etag, last_modified
+
+    def conditional_response(self, request, get_response):
+        etag, last_modified = self.get_validators(request)
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = get_response()
+
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            patch_vary_headers(response, ('Authorization',))
+
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, lambda: super(ConditionalGetMixin, self).list(
+                request, *args, **kwargs
+            )
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, lambda: super(ConditionalGetMixin, self).retrieve(
+                request, *args, **kwargs
+            )
+        )
@@ -0,0 +1,147 @@
+import json
+import logging
+import uuid
+from datetime import timedelta
+from tempfile import TemporaryFile
+
+from django.conf import settings
+from django.core.files import File
+from django.db.models import Q
+from django.utils import timezone
+
+from food.models import ExportJob
+
+from .background import run_in_background
+from .make_shopping_file import FILE_FORMATS, stream_shopping_file
+
+logger = logging.getLogger(__name__)
+
+
+def stream_user_data(user, file_format='json'):
+    data = {
+        'email': user.email,
+        'username': user.username,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'date_joined': user.date_joined.isoformat(),
+        'recipes': [
+            {
+                'id': recipe.id,
+                'name': recipe.name,
+                'text': recipe.text,
+                'cooking_time': recipe.cooking_time,
+                'created': recipe.created.isoformat(),
+                'tags': [tag.slug for tag in recipe.tags.all()],
+                'ingredients': [
+                    {
+                        'name': amount.ingredient.name,
+                        'measurement_unit': amount.ingredient.measurement_unit,
+                        'amount': amount.amount,
+                    }
+                    for amount in recipe.ingredients.all()
+                ],
+            }
+            for recipe in user.recipes.prefetch_related(
+                'tags', 'ingredients__ingredient'
+            )
+        ],
+        'favorites': list(
+            user.favorite.values_list('recipe', flat=True)
+        ),
+        'shopping_cart': list(
+            user.shoppingcart.values_list('recipe', flat=True)
+        ),
+        'subscriptions': list(
+            user.subscribe_on.values_list('subscription', flat=True)
+        ),
+    }
+    yield json.dumps(data, ensure_ascii=False, indent=2).encode()
+
+
+# kind: (function(user, file_format) -> bytes chunks, file formats)
+EXPORTERS = {
+    ExportJob.SHOPPING_CART: (stream_shopping_file, FILE_FORMATS),
+    ExportJob.USER_DATA: (stream_user_data, ('json',)),
+}
+
+
+def run_export(job_id):
+    # pending -> running in one update, so job is run only once
+    if not ExportJob.objects.filter(
+        pk=job_id, status=ExportJob.PENDING
+    ).update(status=ExportJob.RUNNING, started=timezone.now()):
+        return
+
+    job = ExportJob.objects.select_related('user').get(pk=job_id)
+    stream, _ = EXPORTERS[job.kind]
+
+    try:
+        with TemporaryFile() as file:
+            for chunk in stream(job.user, job.file_format):
+                file.write(chunk)
+
+            # private storage, sent only by ExportJobViewSet.download
+            job.file.save(
+                f'{uuid.uuid4().hex}/{job.kind}.{job.file_format}',
+                File(file),
+                save=False,
+            )
+        job.status = ExportJob.DONE
+    except Exception as error:
+        job.status = ExportJob.FAILED
+        job.error = str(error)
+        logger.exception('export %s failed', job_id)
+    finally:
+        job.finished = timezone.now()
+        job.expires = job.finished + timedelta(
+            seconds=settings.EXPORT_TIMEOUT
+        )
+        job.save()
+
+
+def start_export(user, kind, file_format) -> ExportJob:
+    job = ExportJob.objects.create(
+        user=user, kind=kind, file_format=file_format
+    )
+    run_in_background(run_export, job.pk)
+    return job
+
+
+def run_pending_exports(older_than):
+    # jobs lost by restarted workers
+    for job_id in ExportJob.objects.filter(
+        status=ExportJob.PENDING,
+        created__lt=timezone.now() - timedelta(seconds=older_than),
+    ).values_list('pk', flat=True):
+        run_export(job_id)
+
+
+def fail_interrupted_exports(older_than) -> int:
+    # jobs running in killed workers, they expire like failed ones
+    now = timezone.now()
+    started = now - timedelta(seconds=older_than)
+    return ExportJob.objects.filter(
+        Q(started__lt=started)
+        # started before the date was saved
+        | Q(started__isnull=True, created__lt=started),
+        status=ExportJob.RUNNING,
+    ).update(
+        status=ExportJob.FAILED,
+        error='interrupted',
+        finished=now,
+        expires=now + timedelta(seconds=settings.EXPORT_TIMEOUT),
+    )
+
+
+def delete_expired_exports() -> int:
+    # run every EXPORT_CLEAN_INTERVAL by `manage.py exports -c -i`,
+    # expired files aren't downloaded before that
+    expired = list(ExportJob.objects.filter(expires__lt=timezone.now()))
+
+    for job in expired:
+        if job.file:
+            job.file.delete(save=False)
+
+    return ExportJob.objects.filter(
+        pk__in=[job.pk for job in expired]
+    ).delete()[0]
@@ -0,0 +1,155 @@
+import heapq
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+
+from food.models import FeedEntry, Recipe, Subscribe
+from users.models import User
+
+from .pagination import KeysetPagination
+from .prefetch import prefetch_top_recipes
+
+BATCH_SIZE = 1000
+
+
+def get_light_authors(author_ids) -> list[int]:
+    # authors whose recipes are written to followers' feeds
+    return list(User.objects.filter(
+        pk__in=author_ids, followers_count__lt=settings.FEED_FANOUT_LIMIT
+    ).values_list('pk', flat=True))
+
+
+def fan_out(recipes):
+    """Write new recipes of authors with few followers to their feeds."""
+    recipes = list(recipes)
+    light = get_light_authors({recipe.author_id for recipe in recipes})
+    if not light:
+        return
+
+    followers = defaultdict(list)
+    for author_id, user_id in Subscribe.objects.filter(
+        subscription__in=light
+    ).values_list('subscription', 'user'):
+        followers[author_id].append(user_id)
+
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id,
+                recipe_id=recipe.pk,
+                author_id=recipe.author_id,
+                created=recipe.created,
+            )
+            for recipe in recipes
+            for user_id in followers[recipe.author_id]
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(subscriptions):
+    """
+    Write latest recipes of followed authors to feeds of followers,
+    subscriptions are (user id, author id) pairs.
+    """
+    subscriptions = list(subscriptions)
+    light = set(get_light_authors({author for _, author in subscriptions}))
+    authors = prefetch_top_recipes(
+        User.objects.filter(pk__in=light).only('pk'),
+        settings.FEED_BACKFILL_RECIPES,
+        fields=('created',),
+    )
+    recipes = {author.pk: author.top_recipes for author in authors}
+
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id,
+                recipe_id=recipe.pk,
+                author_id=author_id,
+                created=recipe.created,
+            )
+            for user_id, author_id in subscriptions
+            if author_id in light
+            for recipe in recipes[author_id]
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill_followers(author_id):
+    # author has fewer followers than the limit again, recipes published
+    # meanwhile weren't written to feeds
+    backfill(Subscribe.objects.filter(
+        subscription=author_id
+    ).values_list('user', 'subscription'))
+
+
+def remove(user_id, author_id):
+    FeedEntry.objects.filter(user=user_id, author=author_id).delete()
+
+
+def rebuild_feeds(user_ids):
+    FeedEntry.objects.filter(user__in=user_ids).delete()
+    backfill(Subscribe.objects.filter(
+        user__in=user_ids
+    ).values_list('user', 'subscription'))
+
+
+def get_feed(user, position=None, size=10) -> list[int]:
+    """
+    Ids of recipes in feed after position (created, id): entries
+    written to the feed merged with recipes of followed authors
+    with many followers.
+    """
+    heavy = list(Subscribe.objects.filter(
+        user=user,
+        subscription__followers_count__gte=settings.FEED_FANOUT_LIMIT,
+    ).values_list('subscription', flat=True))
+
+    def after(id_field):
+        if position is None:
+            return Q()
+        created, recipe_id = position
+        return Q(created__lt=created) | Q(
+            created=created, **{f'{id_field}__lt': recipe_id}
+        )
+
+    sources = [
+        FeedEntry.objects.filter(after('recipe'), user=user).exclude(
+            author__in=heavy
+        ).order_by('-created', '-recipe_id').values_list('created', 'recipe')
+    ]
+    if heavy:
+        sources.append(
+            Recipe.objects.filter(after('id'), author__in=heavy).order_by(
+                '-created', '-id'
+            ).values_list('created', 'id')
+        )
+
+    merged = heapq.merge(
+        *(list(source[:size]) for source in sources), reverse=True
+    )
+    return [recipe_id for _, recipe_id in islice(merged, size)]
+
+
+class FeedPagination(KeysetPagination):
+    """Keyset pagination of feed of request user, ordered like recipes."""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        position = self.decode_cursor(request, queryset.model)
+        ids = get_feed(request.user, position, self.page_size + 1)
+        recipes = queryset.in_bulk(ids)
+
+        self.has_next = len(ids) > self.page_size
+        self.page = [
+            recipes[pk] for pk in ids[:self.page_size] if pk in recipes
+        ]
+        return self.page
@@ -0,0 +1,91 @@
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from food.models import Recipe
+
+from .cache import invalidate_recipes
+
+# name: (width, height), images are cropped to the size
+VARIANTS = {
+    'thumbnail': (160, 160),
+    'card': (480, 360),
+}
+# extension: (Pillow format, save options)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+VARIANTS_DIR = 'recipes/variants'
+
+
+def open_image(file) -> Image.Image:
+    image = Image.open(file)
+    # rotate by EXIF orientation, EXIF itself isn't saved to variants
+    image = ImageOps.exif_transpose(image)
+
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+
+    return image.convert('RGB')
+
+
+def render_variants(image):
+    # yields variant name, extension and encoded image
+    for name, size in VARIANTS.items():
+        variant = ImageOps.fit(image, size, Image.LANCZOS)
+        for extension, (image_format, options) in FORMATS.items():
+            buffer = BytesIO()
+            variant.save(buffer, image_format, **options)
+            yield name, extension, buffer.getvalue()
+
+
+def make_variants(recipe_id):
+    recipe = Recipe.objects.only('image').get(pk=recipe_id)
+    if not recipe.image:
+        return
+
+    source = recipe.image.name
+    storage = recipe.image.storage
+
+    with recipe.image.open('rb') as file:
+        image = open_image(file)
+
+    variants = {'source': source}
+    for name, extension, content in render_variants(image):
+        variants.setdefault(name, {})[extension] = storage.save(
+            f'{VARIANTS_DIR}/{name}.{extension}', ContentFile(content)
+        )
+
+    # image could be changed while variants were made. Files aren't
+    # deleted, storage is content-addressed and they may be shared
+    if Recipe.objects.filter(pk=recipe_id, image=source).update(
+        image_variants=variants
+    ):
+        invalidate_recipes(recipe_id)
+
+
+def get_variants_urls(recipe, request=None):
+    """
+    {variant name: {extension: url}} or None while variants of current
+    image aren't ready.
+    """
+    variants = recipe.image_variants
+    if not variants or variants.get('source') != recipe.image.name:
+        return None
+
+    storage = recipe.image.storage
+    urls = {}
+    for name in VARIANTS:
+        urls[name] = {}
+        for extension, file_name in variants.get(name, {}).items():
+            url = storage.url(file_name)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[name][extension] = url
+
+    return urls
@@ -0,0 +1,299 @@
+import sys
+from array import array
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Length
+
+from food.models import IngredientAmount, RecipeIndex
+
+from .background import run_once_on_commit
+
+EMPTY = np.zeros(0, dtype=np.uint32)
+# postings of ingredients and sizes are split by recipe id % SHARDS,
+# so concurrent writes of recipes rarely lock and rewrite the same row.
+# Changing it needs `manage.py ingredient_index`.
+SHARDS = 16
+# sizes of fewer `have` candidates are read from their rows instead of
+# postings of sizes
+MAX_SIZE_LOOKUPS = 1000
+
+
+def encode(ids) -> bytes:
+    values = array('I', sorted(ids))
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values.tobytes()
+
+
+def decode(data) -> np.ndarray:
+    return np.frombuffer(bytes(data), dtype='<u4').astype(np.uint32)
+
+
+def get_recipes_ingredients(recipe_ids) -> dict:
+    # {recipe id: set of ingredient ids}, from relations
+    ingredients = defaultdict(set)
+    for recipe_id, ingredient_id in IngredientAmount.objects.filter(
+        recipe__in=recipe_ids
+    ).values_list('recipe', 'ingredient'):
+        ingredients[recipe_id].add(ingredient_id)
+    return ingredients
+
+
+def get_shard(kind, recipe_id) -> int:
+    # recipe rows have one writer, the recipe
+    return 0 if kind == RecipeIndex.RECIPE else recipe_id % SHARDS
+
+
+def select_rows(keys):
+    keys_by_kind = defaultdict(list)
+    for kind, key, shard in keys:
+        keys_by_kind[kind, shard].append(key)
+
+    condition = Q()
+    for (kind, shard), kind_keys in keys_by_kind.items():
+        condition |= Q(kind=kind, shard=shard, key__in=kind_keys)
+
+    return RecipeIndex.objects.select_for_update().filter(
+        condition
+    ).order_by('kind', 'key', 'shard')
+
+
+def lock_rows(keys) -> dict:
+    """
+    {(kind, key, shard): RecipeIndex} locked in one order, missing rows
+    are created first, so concurrent updates wait for each other.
+    """
+    keys = set(keys)
+    if not keys:
+        return {}
+
+    rows = {(row.kind, row.key, row.shard): row for row in select_rows(keys)}
+    missing = keys - set(rows)
+    if missing:
+        RecipeIndex.objects.bulk_create(
+            [
+                RecipeIndex(kind=kind, key=key, shard=shard, ids=b'')
+                for kind, key, shard in missing
+            ],
+            ignore_conflicts=True,
+        )
+        rows.update(
+            ((row.kind, row.key, row.shard), row)
+            for row in select_rows(missing)
+        )
+
+    return rows
+
+
+def write_rows(rows, values):
+    # values {(kind, key, shard): ids array}, empty rows are deleted
+    changed, empty = [], []
+    for key, ids in values.items():
+        row = rows[key]
+        if len(ids):
+            row.ids = encode(ids)
+            changed.append(row)
+        else:
+            empty.append(row.pk)
+
+    RecipeIndex.objects.bulk_update(changed, ('ids',))
+    RecipeIndex.objects.filter(pk__in=empty).delete()
+
+
+def update_recipes(recipe_ids):
+    """
+    Move recipes in postings from their indexed ingredients to current
+    ones, deleted recipes are removed.
+    """
+    recipe_ids = set(recipe_ids)
+    if not recipe_ids:
+        return
+
+    with transaction.atomic():
+        recipe_rows = lock_rows(
+            (RecipeIndex.RECIPE, pk, 0) for pk in recipe_ids
+        )
+        # read after lock, concurrent update of the recipe is finished
+        current = get_recipes_ingredients(recipe_ids)
+
+        # {(kind, key, shard): (recipes to add, recipes to remove)}
+        changes = defaultdict(lambda: (set(), set()))
+        recipes = {}
+        for recipe_id in recipe_ids:
+            old = set(decode(
+                recipe_rows[RecipeIndex.RECIPE, recipe_id, 0].ids
+            ).tolist())
+            new = current.get(recipe_id, set())
+            recipes[RecipeIndex.RECIPE, recipe_id, 0] = np.array(
+                sorted(new), dtype=np.uint32
+            )
+            shard = get_shard(RecipeIndex.INGREDIENT, recipe_id)
+            for ingredient_id in new - old:
+                changes[RecipeIndex.INGREDIENT, ingredient_id, shard][0].add(
+                    recipe_id
+                )
+            for ingredient_id in old - new:
+                changes[RecipeIndex.INGREDIENT, ingredient_id, shard][1].add(
+                    recipe_id
+                )
+            if len(old) != len(new):
+                if new:
+                    changes[RecipeIndex.SIZE, len(new), shard][0].add(
+                        recipe_id
+                    )
+                if old:
+                    changes[RecipeIndex.SIZE, len(old), shard][1].add(
+                        recipe_id
+                    )
+
+        rows = lock_rows(changes)
+        postings = {}
+        for key, (added, removed) in changes.items():
+            ids = decode(rows[key].ids)
+            ids = np.union1d(ids, np.fromiter(added, dtype=np.uint32))
+            postings[key] = np.setdiff1d(
+                ids, np.fromiter(removed, dtype=np.uint32)
+            )
+
+        write_rows(rows, postings)
+        write_rows(recipe_rows, recipes)
+
+
+def update_recipes_on_commit(*recipe_ids):
+    run_once_on_commit(update_recipes, recipe_ids)
+
+
+def rebuild_index():
+    with transaction.atomic():
+        RecipeIndex.objects.all().delete()
+
+        recipes = defaultdict(set)
+        for recipe_id, ingredient_id in IngredientAmount.objects.filter(
+            recipe__isnull=False
+        ).values_list('recipe', 'ingredient').iterator():
+            recipes[recipe_id].add(ingredient_id)
+
+        postings = defaultdict(list)
+        for recipe_id, ingredients in recipes.items():
+            shard = get_shard(RecipeIndex.INGREDIENT, recipe_id)
+            postings[RecipeIndex.SIZE, len(ingredients), shard].append(
+                recipe_id
+            )
+            for ingredient_id in ingredients:
+                postings[RecipeIndex.INGREDIENT, ingredient_id, shard].append(
+                    recipe_id
+                )
+
+        RecipeIndex.objects.bulk_create(
+            (
+                RecipeIndex(kind=kind, key=key, shard=shard, ids=encode(ids))
+                for (kind, key, shard), ids in [
+                    *postings.items(),
+                    *(
+                        ((RecipeIndex.RECIPE, recipe_id, 0), ingredients)
+                        for recipe_id, ingredients in recipes.items()
+                    ),
+                ]
+            ),
+            batch_size=1000,
+        )
+
+    return len(recipes)
+
+
+def load_postings(condition) -> dict:
+    # {(kind, key): sorted ids} of rows matching condition, shards merged
+    parts = defaultdict(list)
+    for kind, key, ids in RecipeIndex.objects.filter(condition).values_list(
+        'kind', 'key', 'ids'
+    ):
+        parts[kind, key].append(decode(ids))
+
+    return {
+        key: ids[0] if len(ids) == 1 else np.sort(np.concatenate(ids))
+        for key, ids in parts.items()
+    }
+
+
+def load_ingredients(ingredient_ids) -> dict:
+    # {ingredient id: recipe ids}
+    return {
+        key: ids
+        for (_, key), ids in load_postings(Q(
+            kind=RecipeIndex.INGREDIENT, key__in=list(ingredient_ids)
+        )).items()
+    }
+
+
+def get_sizes(recipe_ids, min_size, max_size) -> np.ndarray:
+    """
+    Numbers of ingredients of sorted recipes, 0 if not known or not
+    between min_size and max_size.
+    """
+    sizes = np.zeros(len(recipe_ids), dtype=np.int64)
+
+    if len(recipe_ids) <= MAX_SIZE_LOOKUPS:
+        # lengths of ingredients arrays, without reading them
+        rows = np.array(RecipeIndex.objects.filter(
+            kind=RecipeIndex.RECIPE, key__in=recipe_ids.tolist()
+        ).annotate(
+            length=Length('ids')
+        ).values_list('key', 'length'), dtype=np.int64).reshape(-1, 2)
+        sizes[np.searchsorted(recipe_ids, rows[:, 0])] = (
+            rows[:, 1] // EMPTY.itemsize
+        )
+        return sizes
+
+    for (_, size), ids in load_postings(Q(
+        kind=RecipeIndex.SIZE, key__gte=min_size, key__lte=max_size
+    )).items():
+        _, found, _ = np.intersect1d(
+            recipe_ids, ids, assume_unique=True, return_indices=True
+        )
+        sizes[found] = size
+    return sizes
+
+
+def find_recipes(have=(), missing=0, contains=()) -> dict:
+    """
+    {recipe id: number of missing ingredients} of recipes with all
+    ingredients from `contains` and, if `have` is given, with some
+    ingredients from `have` and at most `missing` ones not from it.
+    """
+    have, contains = set(have), set(contains)
+    ingredients = load_ingredients(have | contains)
+
+    result = None
+    if have:
+        ids, matched = np.unique(
+            np.concatenate([EMPTY, *(
+                ingredients[pk] for pk in have if pk in ingredients
+            )]),
+            return_counts=True,
+        )
+        # only sizes of candidates which can fit are read
+        sizes = get_sizes(
+            ids, int(matched.min()), int(matched.max()) + missing
+        ) if len(ids) else matched
+        absent = sizes - matched
+        fit = (sizes > 0) & (absent <= missing)
+        result = dict(zip(ids[fit].tolist(), absent[fit].tolist()))
+
+    if contains:
+        ids = None
+        for pk in contains:
+            postings = ingredients.get(pk, EMPTY)
+            ids = postings if ids is None else np.intersect1d(
+                ids, postings, assume_unique=True
+            )
+        if result is None:
+            result = dict.fromkeys(ids.tolist(), 0)
+        else:
+            result = {
+                pk: result[pk] for pk in ids.tolist() if pk in result
+            }
+
+    return result or {}
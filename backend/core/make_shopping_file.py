@@ -1,50 +1,82 @@
+import csv
+import json
 from time import time
 
-from django.core.files.base import ContentFile
+from django.http import StreamingHttpResponse
 
-AMOUNT_INDEX = 0  # index of name in dict result
-UNIT_INDEX = 1  # index of measurement unit in dict result
+from food.models import ShoppingListItem
 
+CONTENT_TYPES = {
+    'txt': 'text/plain; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json',
+}
+FILE_FORMATS = tuple(CONTENT_TYPES)
 
-def cart_format(item: tuple) -> str:
-    ingredient_name = item[0]
-    amount, unit = item[1]
 
-    return (
-        f"{ingredient_name}: {amount} {unit}."
-    )
+def get_ingredients(user) -> list[dict]:
+    # maintained shopping list with names and units of its ingredients
+    return [
+        {'name': name, 'measurement_unit': unit, 'amount': amount}
+        for name, unit, amount in ShoppingListItem.objects.filter(
+            user=user
+        ).order_by(
+            'ingredient__name', 'ingredient__measurement_unit'
+        ).values_list(
+            'ingredient__name', 'ingredient__measurement_unit', 'amount'
+        )
+    ]
+
+
+class Echo:
+    # file-like object for csv.writer, returns written line
+    def write(self, value):
+        return value
 
 
-def get_ingredients(cart) -> list[str]:
-    dict_result = {}  # {'name'}: [amount, measurement_unit]
-    result = []
+def stream_txt(ingredients):
+    for item in ingredients:
+        yield (
+            f"{item['name']}: {item['amount']} "
+            f"{item['measurement_unit']}.\n"
+        )
+    yield "Enjoy your lunch :)"
 
-    for element in cart:
-        recipe = element.recipe
 
-        for ingredient_amount in recipe.ingredients.all():
-            ingredient = ingredient_amount.ingredient
+def stream_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for item in ingredients:
+        yield writer.writerow(
+            (item['name'], item['measurement_unit'], item['amount'])
+        )
 
-            ingredient_name = ingredient.name
-            unit = ingredient.measurement_unit
-            amount = int(ingredient_amount.amount)
 
-            if (
-                ingredient_name in list(dict_result.keys())
-                and dict_result[ingredient_name][UNIT_INDEX] == unit
-            ):
-                dict_result[ingredient_name][AMOUNT_INDEX] += amount
+def stream_json(ingredients):
+    yield '['
+    for index, item in enumerate(ingredients):
+        yield (',' if index else '') + json.dumps(item, ensure_ascii=False)
+    yield ']'
 
-            else:
-                dict_result[ingredient_name] = [amount, unit]
 
-    for res in dict_result.items():
-        result.append(cart_format(res))
+STREAMS = {
+    'txt': stream_txt,
+    'csv': stream_csv,
+    'json': stream_json,
+}
 
-    return result
 
+def stream_shopping_file(user, file_format='txt'):
+    for line in STREAMS[file_format](get_ingredients(user)):
+        yield line.encode()
 
-def make_shopping_file(cart) -> ContentFile:
-    text = '\n'.join(get_ingredients(cart))
-    text += '\n' + "Enjoy your lunch :)"
-    return ContentFile(text.encode(), "shopping_list_" + str(time()) + ".txt")
+
+def make_shopping_file(user, file_format='txt') -> StreamingHttpResponse:
+    response = StreamingHttpResponse(
+        stream_shopping_file(user, file_format),
+        content_type=CONTENT_TYPES[file_format],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="shopping_list_{time()}.{file_format}"'
+    )
+    return response
@@ -1,7 +1,191 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'limit'
     max_page_size = 1000
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination by the values of the last item on the page.
+    Doesn't use COUNT and OFFSET, so deep pages cost as much as the first.
+    Ordering must be unique, view may override it with `keyset_ordering`.
+    Queryset ordered otherwise (search rank, ...) isn't paginated by cursor.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size = StandardResultsSetPagination.page_size
+    page_size_query_param = StandardResultsSetPagination.page_size_query_param
+    max_page_size = StandardResultsSetPagination.max_page_size
+    ordering = ('-created', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+    invalid_ordering_message = (
+        'Cursor pagination is not available with this ordering'
+    )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = getattr(view, 'keyset_ordering', self.ordering)
+        self.page_size = self.get_page_size(request)
+
+        # ordering of filters would be replaced with wrong pages
+        ordering = tuple(queryset.query.order_by)
+        if ordering and ordering != tuple(self.ordering):
+            raise ValidationError({'cursor': self.invalid_ordering_message})
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(position))
+
+        # one extra item shows whether the next page exists
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        if page_size <= 0:
+            return self.page_size
+
+        return min(page_size, self.max_page_size)
+
+    def get_fields(self):
+        # ('-created', 'id') -> [('created', True), ('id', False)]
+        return [
+            (field.lstrip('-'), field.startswith('-'))
+            for field in self.ordering
+        ]
+
+    def get_position_filter(self, position):
+        # lexicographic "after" condition:
+        # (a < x) or (a = x and b < y) or ...
+        condition = Q()
+        equal = {}
+
+        for (name, descending), value in zip(self.get_fields(), position):
+            lookup = 'lt' if descending else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+
+        return condition
+
+    def encode_cursor(self, item):
+        position = [
+            getattr(item, name) for name, _ in self.get_fields()
+        ]
+        position = [
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in position
+        ]
+        return base64.urlsafe_b64encode(
+            json.dumps(position).encode()
+        ).decode()
+
+    def decode_cursor(self, request, model):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            fields = self.get_fields()
+            if len(position) != len(fields):
+                raise ValueError
+
+            return [
+                model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(fields, position)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'results': schema,
+            },
+        }
+
+
+class CursorSwitchPagination(StandardResultsSetPagination):
+    """
+    Page number pagination, switched to keyset pagination when client
+    asks for it with `?pagination=cursor`, `?cursor=...`
+    or `X-Pagination: cursor` header.
+    """
+
+    mode_query_param = 'pagination'
+    mode_header = 'X-Pagination'
+    keyset_pagination_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+
+        if self.is_cursor_requested(request):
+            self.keyset = self.keyset_pagination_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+
+        return super().paginate_queryset(queryset, request, view)
+
+    def is_cursor_requested(self, request):
+        return (
+            self.keyset_pagination_class.cursor_query_param
+            in request.query_params
+            or request.query_params.get(self.mode_query_param) == 'cursor'
+            or request.headers.get(self.mode_header) == 'cursor'
+        )
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+
+        return super().get_paginated_response(data)
+
+    def get_next_link(self):
+        if self.keyset is not None:
+            return self.keyset.get_next_link()
+
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if self.keyset is not None:
+            return None
+
+        return super().get_previous_link()
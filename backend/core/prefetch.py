@@ -0,0 +1,52 @@
+from collections import defaultdict
+
+from django.db.models import F, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+
+from food.models import Recipe
+
+RECIPES_ORDERING = ('-created', '-id')
+
+
+def prefetch_top_recipes(authors, limit=None, fields=None,
+                         to_attr='top_recipes'):
+    """
+    Set `to_attr` of every author to list of the latest recipes, at most
+    `limit` per author, in one query with
+    ROW_NUMBER() OVER (PARTITION BY author).
+    """
+    authors = list(authors)
+    if not authors:
+        return authors
+
+    recipes = Recipe.objects.filter(author__in=authors)
+
+    if limit is not None:
+        ranked = recipes.annotate(position=Window(
+            RowNumber(),
+            partition_by=F('author'),
+            order_by=[
+                F(field.lstrip('-')).desc() if field.startswith('-')
+                else F(field).asc()
+                for field in RECIPES_ORDERING
+            ],
+        )).order_by().values('id', 'position')
+        sql, params = ranked.query.sql_with_params()
+        recipes = Recipe.objects.filter(id__in=RawSQL(
+            f'SELECT ranked.id FROM ({sql}) ranked '
+            f'WHERE ranked.position <= %s',
+            (*params, limit),
+        ))
+
+    if fields is not None:
+        recipes = recipes.only('author', *fields)
+
+    by_author = defaultdict(list)
+    for recipe in recipes.order_by(*RECIPES_ORDERING):
+        by_author[recipe.author_id].append(recipe)
+
+    for author in authors:
+        setattr(author, to_attr, by_author[author.pk])
+
+    return authors
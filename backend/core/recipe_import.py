@@ -0,0 +1,381 @@
+import csv
+import io
+import json
+import os
+import time
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import connection, transaction
+from django.db.models import F, Q
+
+from food.models import IngredientAmount, Recipe
+from users.models import User
+
+from .autocomplete import normalize
+from .cache import invalidate_recipes
+from .catalog import ingredients_snapshot, tags_snapshot
+from .feed import fan_out
+from .ingredient_index import update_recipes
+from .search import index_recipes
+
+
+def read_jsonl(file):
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_csv(file):
+    """
+    Columns name, text, cooking_time, author, tags, ingredients, image.
+    Tags are `slug|slug`, ingredients are `name:amount|name:amount`.
+    """
+    for row in csv.DictReader(file):
+        row['tags'] = [
+            slug.strip() for slug in row.get('tags', '').split('|')
+            if slug.strip()
+        ]
+        ingredients = []
+        for item in row.get('ingredients', '').split('|'):
+            name, _, amount = item.rpartition(':')
+            if name.strip():
+                ingredients.append({'name': name, 'amount': amount})
+        row['ingredients'] = ingredients
+        yield row
+
+
+READERS = {
+    'jsonl': read_jsonl,
+    'csv': read_csv,
+}
+
+
+class Checkpoint:
+    """
+    Position of the last imported record in input file. Batch is written
+    as pending before commit, on resume it is done if its first recipe
+    exists, so every record is imported once.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.position = 0
+        self.pending = None
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path) as file:
+            data = json.load(file)
+
+        self.position = data['position']
+        pending = data.get('pending')
+        if pending and Recipe.objects.filter(pk=pending['first_id']).exists():
+            self.position = pending['position']
+        self.save()
+
+    def save(self, pending=None):
+        self.pending = pending
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump({'position': self.position, 'pending': pending}, file)
+        os.replace(temp_path, self.path)
+
+    def delete(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class RecipeImporter:
+    """
+    Stream recipes in batches. Ids are reserved before insert, so recipes
+    and their relations are written without reading ids back: by COPY on
+    PostgreSQL, by bulk_create on other databases.
+    """
+
+    def __init__(self, images_dir='', batch_size=1000):
+        self.images_dir = images_dir
+        self.batch_size = batch_size
+        self.image_field = Recipe._meta.get_field('image')
+        # (ingredient id, amount): ingredient amount id
+        self.amounts = {}
+        self.authors = {}
+        # (ingredients version, {name or (name, unit): ingredient id})
+        self.ingredient_keys = (None, {})
+        self.errors = []
+        self.imported = 0
+
+    def run(self, records, checkpoint, report=print):
+        records = islice(records, checkpoint.position, None)
+        started = time.monotonic()
+
+        while True:
+            batch = list(islice(records, self.batch_size))
+            if not batch:
+                break
+
+            position = checkpoint.position + len(batch)
+            with transaction.atomic():
+                recipes = self.import_batch(batch, checkpoint.position)
+                if recipes:
+                    # file is written before commit, see Checkpoint
+                    checkpoint.save(
+                        {'position': position, 'first_id': recipes[0].pk}
+                    )
+
+            checkpoint.position = position
+            checkpoint.save()
+            self.imported += len(recipes)
+
+            rate = self.imported / max(time.monotonic() - started, 1e-9)
+            report(
+                f'{position} records read, {self.imported} recipes '
+                f'imported, {rate:.0f} rows/sec'
+            )
+
+        invalidate_recipes()
+
+    def import_batch(self, records, offset) -> list[Recipe]:
+        self.load_authors(records)
+        self.load_amounts(records)
+
+        recipes, tags, amounts = [], [], []
+        for number, record in enumerate(records, offset + 1):
+            try:
+                recipe, recipe_tags, recipe_amounts = self.build(record)
+            except (
+                KeyError, TypeError, ValueError, ValidationError, OSError
+            ) as error:
+                # OSError: image is missing or can't be read
+                self.errors.append((number, error))
+                continue
+
+            recipes.append(recipe)
+            tags.append(recipe_tags)
+            amounts.append(recipe_amounts)
+
+        if not recipes:
+            return []
+
+        self.save_amounts(amounts)
+        for recipe, pk in zip(recipes, self.reserve_ids(len(recipes))):
+            recipe.pk = pk
+
+        self.insert(Recipe, recipes)
+        self.insert_relations('tags', recipes, tags)
+        self.insert_relations('ingredients', recipes, [
+            {self.amounts[pair] for pair in pairs} for pairs in amounts
+        ])
+        self.count_recipes(recipes)
+        fan_out(recipes)
+        index_recipes(recipe.pk for recipe in recipes)
+        update_recipes(recipe.pk for recipe in recipes)
+
+        return recipes
+
+    def load_authors(self, records):
+        keys = {
+            str(record.get('author', '')) for record in records
+        } - set(self.authors)
+
+        for pk, email, username in User.objects.filter(
+            Q(email__in=keys) | Q(username__in=keys)
+        ).values_list('pk', 'email', 'username'):
+            self.authors[email] = pk
+            self.authors[username] = pk
+
+    def load_amounts(self, records):
+        # amounts of ingredients in batch, one query
+        ingredient_ids = set()
+        for record in records:
+            for item in record.get('ingredients') or ():
+                try:
+                    ingredient_ids.add(self.get_ingredient_id(item))
+                except (KeyError, TypeError, ValueError):
+                    pass
+
+        self.amounts.update(
+            ((ingredient_id, amount), pk)
+            for pk, ingredient_id, amount in IngredientAmount.objects.filter(
+                ingredient__in=ingredient_ids
+            ).values_list('pk', 'ingredient', 'amount')
+        )
+
+    def get_ingredient_id(self, item) -> int:
+        snapshot = ingredients_snapshot.get()
+        if item.get('id') is not None:
+            return snapshot.by_id[int(item['id'])]['id']
+
+        version, keys = self.ingredient_keys
+        if version != snapshot.version:
+            keys = {}
+            for ingredient in snapshot.items:
+                name = normalize(ingredient['name'])
+                unit = normalize(ingredient['measurement_unit'])
+                keys.setdefault(name, ingredient['id'])
+                keys[name, unit] = ingredient['id']
+            self.ingredient_keys = (snapshot.version, keys)
+
+        key = normalize(item['name'])
+        if item.get('measurement_unit'):
+            key = (key, normalize(item['measurement_unit']))
+        return keys[key]
+
+    def build(self, record):
+        recipe = Recipe(
+            author_id=self.authors[str(record['author'])],
+            name=record['name'].strip(),
+            text=record['text'],
+            cooking_time=int(record['cooking_time']),
+        )
+        recipe.clean_fields(exclude=('author', 'image'))
+
+        tag_ids = tags_snapshot.get().get_index('slug')
+        recipe_tags = {tag_ids[slug] for slug in record.get('tags') or ()}
+
+        recipe_amounts = set()
+        for item in record['ingredients']:
+            amount = int(item['amount'])
+            if amount < 1:
+                raise ValueError(f'wrong amount {amount}')
+            recipe_amounts.add((self.get_ingredient_id(item), amount))
+        if not recipe_amounts:
+            raise ValueError('recipe without ingredients')
+
+        if record.get('image'):
+            path = os.path.join(self.images_dir, record['image'])
+            with open(path, 'rb') as file:
+                recipe.image = self.image_field.storage.save(
+                    self.image_field.generate_filename(
+                        recipe, os.path.basename(path)
+                    ),
+                    File(file),
+                )
+
+        return recipe, recipe_tags, recipe_amounts
+
+    def save_amounts(self, amounts):
+        missing = set().union(*amounts) - set(self.amounts)
+        if not missing:
+            return
+
+        IngredientAmount.objects.bulk_create(
+            [
+                IngredientAmount(ingredient_id=ingredient_id, amount=amount)
+                for ingredient_id, amount in missing
+            ],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        self.amounts.update(
+            ((ingredient_id, amount), pk)
+            for pk, ingredient_id, amount in IngredientAmount.objects.filter(
+                ingredient__in={ingredient_id for ingredient_id, _ in missing}
+            ).values_list('pk', 'ingredient', 'amount')
+        )
+
+    def reserve_ids(self, count) -> list[int]:
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+                    'FROM generate_series(1, %s)',
+                    [Recipe._meta.db_table, 'id', count],
+                )
+                return [pk for pk, in cursor.fetchall()]
+
+        # SQLite: counter of AUTOINCREMENT, the update takes write lock
+        # of database till commit and new rows get ids after reserved
+        table = Recipe._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE sqlite_sequence SET seq = seq + %s WHERE name = %s',
+                [count, table],
+            )
+            if not cursor.rowcount:
+                # no recipes were inserted yet
+                cursor.execute(
+                    'INSERT INTO sqlite_sequence (name, seq) VALUES '
+                    f'(%s, (SELECT COALESCE(MAX(id), 0) FROM {table}) + %s)',
+                    [table, count],
+                )
+            cursor.execute(
+                'SELECT seq FROM sqlite_sequence WHERE name = %s', [table]
+            )
+            last_id, = cursor.fetchone()
+        return list(range(last_id - count + 1, last_id + 1))
+
+    def insert(self, model, objects):
+        if connection.vendor != 'postgresql':
+            model.objects.bulk_create(objects, batch_size=self.batch_size)
+            return
+
+        fields = [
+            field for field in model._meta.concrete_fields
+            if not field.primary_key or objects[0].pk is not None
+        ]
+        copy_rows(
+            model._meta.db_table,
+            [field.column for field in fields],
+            (
+                [
+                    field.get_db_prep_save(
+                        field.pre_save(obj, True), connection
+                    )
+                    for field in fields
+                ]
+                for obj in objects
+            ),
+        )
+
+    def insert_relations(self, field_name, recipes, related_ids):
+        field = Recipe._meta.get_field(field_name)
+        through = field.remote_field.through
+        self.insert(through, [
+            through(**{
+                f'{field.m2m_field_name()}_id': recipe.pk,
+                f'{field.m2m_reverse_field_name()}_id': pk,
+            })
+            for recipe, pks in zip(recipes, related_ids)
+            for pk in pks
+        ])
+
+    def count_recipes(self, recipes):
+        # update per distinct number of new recipes, not per author
+        authors_by_count = defaultdict(list)
+        for author_id, count in Counter(
+            recipe.author_id for recipe in recipes
+        ).items():
+            authors_by_count[count].append(author_id)
+
+        for count, author_ids in authors_by_count.items():
+            User.objects.filter(pk__in=author_ids).update(
+                recipes_count=F('recipes_count') + count
+            )
+
+
+def copy_value(value) -> str:
+    # in COPY csv format unquoted empty value is NULL, quoted is string
+    if value is None:
+        return ''
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def copy_rows(table, columns, rows):
+    """Write rows to PostgreSQL table with COPY ... FROM STDIN."""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(','.join(map(copy_value, row)) + '\n')
+    buffer.seek(0)
+
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {connection.ops.quote_name(table)} '
+            f'({", ".join(map(connection.ops.quote_name, columns))}) '
+            f'FROM STDIN WITH (FORMAT csv)',
+            buffer,
+        )
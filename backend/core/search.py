@@ -0,0 +1,121 @@
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+from food.models import Ingredient, IngredientAmount, Recipe
+
+RECIPES = Recipe._meta.db_table
+RECIPE_INGREDIENTS = Recipe.ingredients.through._meta.db_table
+AMOUNTS = IngredientAmount._meta.db_table
+INGREDIENTS = Ingredient._meta.db_table
+FTS_TABLE = 'food_recipe_fts'
+
+# {aggregate} is names concatenation function of database
+INGREDIENT_NAMES = f'''(
+    SELECT {{aggregate}}(i.name, ' ') FROM {RECIPE_INGREDIENTS} ri
+    JOIN {AMOUNTS} a ON a.id = ri.ingredientamount_id
+    JOIN {INGREDIENTS} i ON i.id = a.ingredient_id
+    WHERE ri.recipe_id = {RECIPES}.id
+)'''
+
+# PostgreSQL: tsvector column with GIN index, recipe name, ingredients
+# names and description weighted A, B, C
+POSTGRESQL_INDEX = f'''
+    UPDATE {RECIPES} SET search_vector =
+        setweight(to_tsvector(%(config)s::regconfig, {RECIPES}.name), 'A')
+        || setweight(to_tsvector(%(config)s::regconfig, coalesce(
+            {INGREDIENT_NAMES.format(aggregate='string_agg')}, ''
+        )), 'B')
+        || setweight(to_tsvector(%(config)s::regconfig, {RECIPES}.text), 'C')
+    WHERE {RECIPES}.id = ANY(%(ids)s)
+'''
+POSTGRESQL_MATCH = (
+    f'{RECIPES}.search_vector @@ to_tsquery(%s::regconfig, %s)'
+)
+POSTGRESQL_RANK = (
+    f'ts_rank({RECIPES}.search_vector, to_tsquery(%s::regconfig, %s))'
+)
+
+# SQLite: FTS5 table with recipe id as rowid, ranked by bm25 with weights
+SQLITE_DELETE = f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({{ids}})'
+SQLITE_INDEX = f'''
+    INSERT INTO {FTS_TABLE} (rowid, name, ingredients, text)
+    SELECT {RECIPES}.id, {RECIPES}.name, coalesce(
+        {INGREDIENT_NAMES.format(aggregate='group_concat')}, ''
+    ), {RECIPES}.text
+    FROM {RECIPES} WHERE {RECIPES}.id IN ({{ids}})
+'''
+SQLITE_MATCH = (
+    f'{RECIPES}.id IN (SELECT rowid FROM {FTS_TABLE} '
+    f'WHERE {FTS_TABLE} MATCH %s)'
+)
+SQLITE_RANK = (
+    f'(SELECT -bm25({FTS_TABLE}, 10.0, 5.0, 1.0) FROM {FTS_TABLE} '
+    f'WHERE {FTS_TABLE} MATCH %s AND rowid = {RECIPES}.id)'
+)
+
+
+def index_recipes(ids):
+    """Rebuild search documents of recipes, two statements at most."""
+    ids = list(ids)
+    if not ids:
+        return
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                POSTGRESQL_INDEX,
+                {'config': settings.SEARCH_CONFIG, 'ids': ids},
+            )
+        elif connection.vendor == 'sqlite':
+            placeholders = ', '.join(['%s'] * len(ids))
+            cursor.execute(SQLITE_DELETE.format(ids=placeholders), ids)
+            cursor.execute(SQLITE_INDEX.format(ids=placeholders), ids)
+
+
+def index_recipes_on_commit(*ids):
+    transaction.on_commit(lambda: index_recipes(ids))
+
+
+def delete_recipes(ids):
+    # PostgreSQL column is deleted with recipe
+    ids = list(ids)
+    if ids and connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                SQLITE_DELETE.format(ids=', '.join(['%s'] * len(ids))), ids
+            )
+
+
+def get_terms(query) -> list[str]:
+    return re.findall(r'\w+', query.casefold())
+
+
+def search_recipes(queryset, query):
+    """
+    Recipes matching all words of query as prefixes,
+    annotated with `search_rank`, better matches first.
+    """
+    terms = get_terms(query)
+    if not terms:
+        return queryset
+
+    if connection.vendor == 'postgresql':
+        search = ' & '.join(f'{term}:*' for term in terms)
+        params = (settings.SEARCH_CONFIG, search)
+        match, rank = POSTGRESQL_MATCH, POSTGRESQL_RANK
+    elif connection.vendor == 'sqlite':
+        search = ' '.join(f'"{term}"*' for term in terms)
+        params = (search,)
+        match, rank = SQLITE_MATCH, SQLITE_RANK
+    else:
+        return queryset.none()
+
+    return queryset.filter(
+        RawSQL(match, params, output_field=BooleanField())
+    ).annotate(
+        search_rank=RawSQL(rank, params, output_field=FloatField())
+    ).order_by('-search_rank', '-created', '-id')
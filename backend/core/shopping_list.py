@@ -0,0 +1,122 @@
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db.models import F, Q, Sum
+
+from food.models import (IngredientAmount, Recipe, ShoppingCart,
+                         ShoppingListItem)
+
+
+def get_cart_users(recipe_ids) -> dict:
+    # {recipe id: [ids of users with recipe in shopping cart]}
+    users = defaultdict(list)
+    for recipe_id, user_id in ShoppingCart.objects.filter(
+        recipe__in=recipe_ids
+    ).values_list('recipe', 'user'):
+        users[recipe_id].append(user_id)
+    return users
+
+
+def apply_deltas(deltas):
+    """
+    Add {(user id, ingredient id): delta} to shopping lists,
+    statement per distinct delta, not per item.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    ShoppingListItem.objects.bulk_create(
+        [
+            ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id)
+            for user_id, ingredient_id in deltas
+        ],
+        ignore_conflicts=True,
+    )
+
+    keys_by_delta = defaultdict(list)
+    for key, delta in deltas.items():
+        keys_by_delta[delta].append(key)
+
+    for delta, keys in keys_by_delta.items():
+        ingredients_by_user = defaultdict(list)
+        for user_id, ingredient_id in keys:
+            ingredients_by_user[user_id].append(ingredient_id)
+
+        ShoppingListItem.objects.filter(reduce(or_, (
+            Q(user_id=user_id, ingredient_id__in=ingredient_ids)
+            for user_id, ingredient_ids in ingredients_by_user.items()
+        ))).update(amount=F('amount') + delta)
+
+    ShoppingListItem.objects.filter(
+        user__in={user_id for user_id, _ in deltas}, amount=0
+    ).delete()
+
+
+def change_cart(user_id, recipe_ids, sign):
+    # recipes added to (sign=1) or removed from (sign=-1) cart of user
+    deltas = defaultdict(int)
+    for ingredient_id, amount in IngredientAmount.objects.filter(
+        recipe__in=list(recipe_ids)
+    ).values_list('ingredient', 'amount'):
+        deltas[user_id, ingredient_id] += sign * amount
+
+    apply_deltas(deltas)
+
+
+def change_recipe_ingredients(pairs, sign):
+    """
+    (recipe id, ingredient amount id) pairs added to (sign=1)
+    or removed from (sign=-1) recipes, apply them to carts with recipes.
+    """
+    pairs = list(pairs)
+    if not pairs:
+        return
+
+    users = get_cart_users({recipe_id for recipe_id, _ in pairs})
+    if not users:
+        return
+
+    amounts = {
+        pk: (ingredient_id, amount)
+        for pk, ingredient_id, amount in IngredientAmount.objects.filter(
+            pk__in={amount_id for _, amount_id in pairs}
+        ).values_list('pk', 'ingredient', 'amount')
+    }
+
+    deltas = defaultdict(int)
+    for recipe_id, amount_id in pairs:
+        ingredient_id, amount = amounts[amount_id]
+        for user_id in users.get(recipe_id, ()):
+            deltas[user_id, ingredient_id] += sign * amount
+
+    apply_deltas(deltas)
+
+
+def existing_pairs(**filters):
+    # (recipe id, ingredient amount id) pairs of recipe ingredients
+    return Recipe.ingredients.through.objects.filter(
+        **filters
+    ).values_list('recipe', 'ingredientamount')
+
+
+def aggregate_shopping_lists(user_ids):
+    # shopping lists from carts, the same as maintained ones
+    return IngredientAmount.objects.filter(
+        recipe__in_shoppingcart__user__in=user_ids
+    ).values(
+        'ingredient', user=F('recipe__in_shoppingcart__user')
+    ).annotate(amount=Sum('amount')).order_by()
+
+
+def rebuild_shopping_lists(user_ids):
+    ShoppingListItem.objects.filter(user__in=user_ids).delete()
+    ShoppingListItem.objects.bulk_create(
+        ShoppingListItem(
+            user_id=item['user'],
+            ingredient_id=item['ingredient'],
+            amount=item['amount'],
+        )
+        for item in aggregate_shopping_lists(user_ids).iterator()
+    )
@@ -0,0 +1,284 @@
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import Length
+
+from food.models import Recipe, RecipeIndex, SimilarRecipe
+
+from .ingredient_index import EMPTY, decode, load_ingredients
+
+# score is cosine of ingredients and Jaccard of tags, weighted
+TAGS_WEIGHT = 0.2
+# candidates by ingredients only, before tags are compared
+CANDIDATES_FACTOR = 5
+# ingredients of more recipes (salt, water) don't find candidates, so
+# postings read by refresh are bounded; they count in scores of
+# candidates found by other ingredients
+COMMON_INGREDIENT_RECIPES = 5000
+# candidates with most shared ingredients of every recipe are scored
+MAX_CANDIDATES = 1000
+# recipe rows read by one query
+LOOKUP_BATCH_SIZE = 1000
+
+
+class IngredientPostings:
+    """
+    Postings of ingredients, except common ones, and ingredients of
+    recipes, loaded on demand.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.recipes = {}
+
+    def load(self, ingredient_ids):
+        missing = list(set(ingredient_ids) - set(self.postings))
+        if not missing:
+            return
+
+        # lengths of shards, without reading them
+        recipes_counts = dict(RecipeIndex.objects.filter(
+            kind=RecipeIndex.INGREDIENT, key__in=missing
+        ).order_by().values('key').annotate(
+            length=Sum(Length('ids'))
+        ).values_list('key', 'length'))
+        self.postings.update(dict.fromkeys(missing, EMPTY))
+        self.postings.update(load_ingredients(
+            pk for pk in missing
+            if recipes_counts.get(pk, 0) // EMPTY.itemsize
+            <= COMMON_INGREDIENT_RECIPES
+        ))
+
+    def get_recipes(self, recipe_ids) -> dict:
+        # {recipe id: ingredient ids} of recipes in the index
+        missing = sorted(set(recipe_ids) - set(self.recipes))
+        for start in range(0, len(missing), LOOKUP_BATCH_SIZE):
+            batch = missing[start:start + LOOKUP_BATCH_SIZE]
+            self.recipes.update(dict.fromkeys(batch))
+            self.recipes.update(
+                (key, decode(ids))
+                for key, ids in RecipeIndex.objects.filter(
+                    kind=RecipeIndex.RECIPE, key__in=batch
+                ).values_list('key', 'ids')
+            )
+
+        return {
+            pk: self.recipes[pk]
+            for pk in recipe_ids if self.recipes[pk] is not None
+        }
+
+
+def top_per_group(groups, values, ties, count) -> np.ndarray:
+    # indexes of `count` largest values in every group, larger ties first
+    order = np.lexsort((-ties, -values, groups))
+    sorted_groups = groups[order]
+    ranks = np.arange(len(order)) - np.searchsorted(
+        sorted_groups, sorted_groups
+    )
+    return order[ranks < count]
+
+
+def get_tags(recipe_ids) -> tuple[np.ndarray, np.ndarray]:
+    # (recipe ids, tag ids) ordered by recipe
+    pairs = np.array(
+        Recipe.tags.through.objects.filter(
+            recipe__in=recipe_ids.tolist()
+        ).order_by('recipe_id').values_list('recipe', 'tag'),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def get_ingredients(recipes) -> tuple[np.ndarray, np.ndarray]:
+    # (recipe ids, ingredient ids) ordered by recipe
+    recipe_ids = sorted(recipes)
+    ingredients = [recipes[pk] for pk in recipe_ids]
+    return (
+        np.repeat(
+            np.array(recipe_ids, dtype=np.int64),
+            [len(pks) for pks in ingredients],
+        ),
+        np.concatenate([EMPTY, *ingredients]).astype(np.int64),
+    )
+
+
+def count_shared(queries, candidates, recipes, values):
+    """
+    Shared values (tags, ingredients) of every pair (query recipe,
+    candidate recipe) and numbers of values of query and candidate,
+    from (recipe ids, values) ordered by recipe.
+    """
+    stride = int(values.max(initial=0)) + 1
+    keys = recipes * stride + values
+    counts = np.bincount(
+        recipes, minlength=int(max(queries.max(), candidates.max())) + 1
+    )
+
+    # values of query of every pair, side by side
+    query_counts = counts[queries]
+    pairs = np.repeat(np.arange(len(queries)), query_counts)
+    starts = np.repeat(np.searchsorted(recipes, queries), query_counts)
+    offsets = np.arange(len(pairs)) - np.repeat(
+        np.cumsum(query_counts) - query_counts, query_counts
+    )
+    query_values = values[starts + offsets]
+
+    shared = np.bincount(
+        pairs[np.isin(candidates[pairs] * stride + query_values, keys)],
+        minlength=len(queries),
+    )
+    return shared, query_counts, counts[candidates]
+
+
+def find_similar(recipe_ids, count, index=None):
+    """
+    (recipe ids, similar recipe ids, scores) of `count` closest recipes
+    sharing not common ingredients with every recipe, for all recipes
+    at once. All candidates if count is None.
+    """
+    index = index or IngredientPostings()
+    forward = index.get_recipes(recipe_ids)
+    if not forward:
+        return EMPTY, EMPTY, np.zeros(0)
+
+    queries = np.array(sorted(forward), dtype=np.int64)
+    ingredients = [forward[pk] for pk in queries.tolist()]
+    index.load(np.concatenate(ingredients).tolist())
+
+    # every (query, candidate) pair once per shared ingredient
+    postings = [
+        index.postings[pk] for pks in ingredients for pk in pks.tolist()
+    ]
+    groups = np.repeat(
+        np.repeat(np.arange(len(queries)), [len(pks) for pks in ingredients]),
+        [len(pks) for pks in postings],
+    )
+    candidates = np.concatenate([EMPTY, *postings]).astype(np.int64)
+    stride = int(max(candidates.max(initial=0), queries.max())) + 1
+    keys, shared = np.unique(groups * stride + candidates, return_counts=True)
+    groups, candidates = np.divmod(keys, stride)
+
+    other = candidates != queries[groups]
+    groups, candidates, shared = (
+        groups[other], candidates[other], shared[other]
+    )
+    best = top_per_group(groups, shared, candidates, MAX_CANDIDATES)
+    groups, candidates = groups[best], candidates[best]
+
+    # postings may have recipes deleted meanwhile
+    recipes = index.get_recipes(
+        np.union1d(queries, candidates).tolist()
+    )
+    known = np.isin(candidates, np.array(list(recipes), dtype=np.int64))
+    groups, candidates = groups[known], candidates[known]
+    if not len(groups):
+        return EMPTY, EMPTY, np.zeros(0)
+
+    shared, query_sizes, sizes = count_shared(
+        queries[groups], candidates, *get_ingredients(recipes)
+    )
+    cosine = shared / np.sqrt(query_sizes * sizes).clip(min=1)
+
+    if count is not None:
+        best = top_per_group(
+            groups, cosine, candidates, count * CANDIDATES_FACTOR
+        )
+        groups, candidates, cosine = (
+            groups[best], candidates[best], cosine[best]
+        )
+
+    shared_tags, query_tags, tags = count_shared(
+        queries[groups],
+        candidates,
+        *get_tags(np.union1d(queries[groups], candidates)),
+    )
+    all_tags = query_tags + tags - shared_tags
+    jaccard = np.divide(
+        shared_tags,
+        all_tags,
+        out=np.zeros(len(groups)),
+        where=all_tags > 0,
+    )
+    scores = (1 - TAGS_WEIGHT) * cosine + TAGS_WEIGHT * jaccard
+
+    if count is None:
+        return queries[groups], candidates, scores
+    best = top_per_group(groups, scores, candidates, count)
+    return queries[groups[best]], candidates[best], scores[best]
+
+
+def update_similar(recipe_ids, index=None):
+    """Replace precomputed neighbours of recipes."""
+    recipe_ids = list(recipe_ids)
+    recipes, similar, scores = find_similar(
+        recipe_ids, settings.SIMILAR_RECIPES, index
+    )
+    # index may still have recipes deleted meanwhile
+    existing = set(Recipe.objects.filter(
+        pk__in=set(similar.tolist())
+    ).values_list('pk', flat=True))
+
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(recipe__in=recipe_ids).delete()
+        SimilarRecipe.objects.bulk_create(
+            (
+                SimilarRecipe(
+                    recipe_id=recipe_id, similar_id=similar_id, score=score
+                )
+                for recipe_id, similar_id, score in zip(
+                    recipes.tolist(), similar.tolist(), scores.tolist()
+                )
+                if similar_id in existing
+            ),
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+
+def refresh_similar(recipe_ids):
+    """
+    Neighbours of changed recipes, then of recipes which had them as
+    neighbours or are closer to them than to their last neighbour.
+    """
+    recipe_ids = set(recipe_ids)
+    index = IngredientPostings()
+
+    # score is symmetric, so scores of changed recipes to all recipes
+    # sharing ingredients tell whose neighbours they are now
+    _, candidates, scores = find_similar(recipe_ids, None, index)
+    best = {}
+    for pk, score in zip(candidates.tolist(), scores.tolist()):
+        best[pk] = max(score, best.get(pk, score))
+
+    affected = set(SimilarRecipe.objects.filter(
+        similar__in=recipe_ids
+    ).values_list('recipe', flat=True))
+    full = {
+        item['recipe']: item['last']
+        for item in SimilarRecipe.objects.filter(
+            recipe__in=list(best)
+        ).values('recipe').annotate(
+            count=Count('pk'), last=Min('score')
+        ).filter(count__gte=settings.SIMILAR_RECIPES)
+    }
+    affected.update(
+        pk for pk, score in best.items()
+        if pk not in full or score >= full[pk]
+    )
+
+    update_similar(recipe_ids, index)
+    update_similar(affected - recipe_ids, index)
+
+
+def rebuild_similar(batch_size=100):
+    """Neighbours of all recipes, yields number of recipes done."""
+    index = IngredientPostings()
+    recipe_ids = list(
+        Recipe.objects.order_by('pk').values_list('pk', flat=True)
+    )
+    for start in range(0, len(recipe_ids), batch_size):
+        update_similar(recipe_ids[start:start + batch_size], index)
+        # ingredients of recipes of one batch and their candidates
+        index.recipes.clear()
+        yield min(start + batch_size, len(recipe_ids))
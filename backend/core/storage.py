@@ -0,0 +1,82 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+from django.utils.functional import cached_property
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Name files by sha256 of content in nested directories by hash prefix:
+    `recipes/ab/cd/abcd....png`. Identical files are stored once, so file
+    with a name never changes and can be cached forever. Files may be
+    shared by many objects and aren't deleted with them.
+    """
+
+    shard_levels = 2
+    shard_length = 2
+
+    def get_content_name(self, name, content) -> str:
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+
+        shards = [
+            digest[level * self.shard_length:(level + 1) * self.shard_length]
+            for level in range(self.shard_levels)
+        ]
+        extension = os.path.splitext(name)[1].lower()
+
+        return os.path.join(
+            os.path.dirname(name), *shards, digest + extension
+        )
+
+    def is_content_name(self, name) -> bool:
+        digest = os.path.splitext(os.path.basename(name))[0]
+        shards = os.path.dirname(name).split('/')[-self.shard_levels:]
+        return (
+            len(digest) == hashlib.sha256().digest_size * 2
+            and shards == [
+                digest[level * self.shard_length:
+                       (level + 1) * self.shard_length]
+                for level in range(self.shard_levels)
+            ]
+        )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        name = self.get_content_name(name, content)
+        if self.exists(name):
+            return name
+
+        return super().save(name, content, max_length=max_length)
+
+
+@deconstructible
+class PrivateStorage(FileSystemStorage):
+    """
+    Files in PRIVATE_MEDIA_ROOT, outside of media served by nginx.
+    They have no url, views send them after checking access.
+    """
+
+    @cached_property
+    def base_location(self):
+        return self._value_or_setting(
+            self._location, settings.PRIVATE_MEDIA_ROOT
+        )
+
+    def url(self, name):
+        raise ValueError('Private files have no url')
+
+
+recipe_storage = ContentAddressedStorage()
+private_storage = PrivateStorage()
@@ -0,0 +1,101 @@
+import math
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Abs, Greatest, Ln, Power
+
+from food.models import Favorite, Recipe, ShoppingCart
+
+# Score is log2 of sum of weight * 2 ** ((added - EPOCH) / half-life)
+# of favorites and carts of recipe. Terms don't change with time, so
+# ordering by score equals ordering by decayed sum at any moment.
+# Logarithm of a term grows by 1 every half-life and never overflows.
+EPOCH = 1704067200  # 2024-01-01 UTC
+WEIGHTS = {
+    Favorite: 1.0,
+    # recipe is going to be cooked
+    ShoppingCart: 2.0,
+}
+# score of recipe without favorites and carts, log2 of 0 in floats
+EMPTY_SCORE = -1e9
+# terms smaller than 2 ** -PRECISION of score don't change it
+PRECISION = 60
+# score left after removal of its last term is rounding error
+REMOVED = 1e-9
+
+
+def get_terms(model, added) -> np.ndarray:
+    # log2 of terms
+    seconds = np.array([date.timestamp() for date in added], dtype=float)
+    return (
+        math.log2(WEIGHTS[model])
+        + (seconds - EPOCH) / settings.TRENDING_HALF_LIFE
+    )
+
+
+def change_score(term, sign) -> Case:
+    """
+    Expression of score with term (log2) added (sign=1) or removed
+    (sign=-1): log2(2 ** score ± 2 ** term) without overflow.
+    """
+    def value(number):
+        return Value(number, output_field=FloatField())
+
+    score = F('score')
+    if sign > 0:
+        return Case(
+            When(score__lt=value(term - PRECISION), then=value(term)),
+            When(score__gt=value(term + PRECISION), then=score),
+            default=Greatest(score, value(term)) + Ln(
+                value(1.0) + Power(value(0.5), Abs(score - value(term)))
+            ) / value(math.log(2)),
+            output_field=FloatField(),
+        )
+
+    return Case(
+        When(score__lt=value(term + REMOVED), then=value(EMPTY_SCORE)),
+        When(score__gt=value(term + PRECISION), then=score),
+        default=score + Ln(
+            value(1.0) - Power(value(2.0), value(term) - score)
+        ) / value(math.log(2)),
+        output_field=FloatField(),
+    )
+
+
+def recompute_scores(batch_size=1000):
+    """Scores of all recipes from favorites and carts, yields changed."""
+    recipe_ids = list(
+        Recipe.objects.order_by('pk').values_list('pk', flat=True)
+    )
+
+    for start in range(0, len(recipe_ids), batch_size):
+        with transaction.atomic():
+            # changes of scores of batch wait, so none is lost
+            recipes = list(Recipe.objects.select_for_update().filter(
+                pk__in=recipe_ids[start:start + batch_size]
+            ).order_by('pk').only('pk', 'score'))
+            ids = np.array([recipe.pk for recipe in recipes])
+
+            scores = np.full(len(recipes), EMPTY_SCORE)
+            for model in WEIGHTS:
+                pairs = list(model.objects.filter(
+                    recipe__in=ids.tolist()
+                ).values_list('recipe', 'created'))
+                if pairs:
+                    recipe_column, added = zip(*pairs)
+                    np.logaddexp2.at(
+                        scores,
+                        np.searchsorted(ids, recipe_column),
+                        get_terms(model, added),
+                    )
+
+            changed = []
+            for recipe, score in zip(recipes, scores.tolist()):
+                if not np.isclose(recipe.score, score, rtol=0, atol=REMOVED):
+                    recipe.score = score
+                    changed.append(recipe)
+            Recipe.objects.bulk_update(changed, ('score',))
+
+        yield len(changed)
@@ -0,0 +1,130 @@
+import threading
+
+from django.db import connection, transaction
+from django.db.models import Case, F, FloatField, When
+from django.utils import timezone
+
+from food.models import Favorite, Recipe, ShoppingCart
+
+from .cache import bump_versions, viewer_version_key
+from .shopping_list import change_cart
+from .trending import change_score, get_terms
+
+# counters of recipes by model
+COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'shopping_carts_count',
+}
+
+
+# models which rows are deleted by remove_recipes in this thread,
+# they are counted by it at once, not by signals one by one
+removing = threading.local()
+
+
+def is_counted(model) -> bool:
+    # counters, score and cart of deleted row are changed by caller
+    return model in getattr(removing, 'models', ())
+
+
+def change_recipes(model, user_id, rows, sign):
+    """
+    (recipe id, added date) rows added to (sign=1) or removed from
+    (sign=-1) favorites or cart of user, in one update of recipes.
+    Signals of model call it for one row.
+    """
+    if not rows:
+        return
+
+    recipe_ids, added = zip(*rows)
+    terms = get_terms(model, added)
+    counter = COUNTERS[model]
+    Recipe.objects.filter(pk__in=recipe_ids).update(**{
+        counter: F(counter) + sign,
+        'score': Case(
+            *(
+                When(pk=pk, then=change_score(term, sign))
+                for pk, term in zip(recipe_ids, terms.tolist())
+            ),
+            output_field=FloatField(),
+        ),
+    })
+
+    if model is ShoppingCart:
+        change_cart(user_id, recipe_ids, sign)
+    bump_versions(viewer_version_key(user_id))
+
+
+def insert_rows(model, user_id, recipe_ids, added) -> list[int]:
+    """
+    Insert rows of existing recipes which aren't in favorites or cart
+    of user yet, in one statement. Returns ids of inserted recipes.
+    """
+    table = model._meta.db_table
+    created = model._meta.get_field('created').get_db_prep_value(
+        added, connection
+    )
+    # ON CONFLICT and RETURNING need SQLite 3.35
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (user_id, recipe_id, created) '
+            f'SELECT %s, id, %s FROM {Recipe._meta.db_table} '
+            f'WHERE id IN ({", ".join(["%s"] * len(recipe_ids))}) '
+            'ON CONFLICT (user_id, recipe_id) DO NOTHING '
+            'RETURNING recipe_id',
+            [user_id, created, *recipe_ids],
+        )
+        return [recipe_id for recipe_id, in cursor.fetchall()]
+
+
+def add_recipes(model, user, recipe_ids) -> tuple[list[int], list[int]]:
+    """
+    Add recipes to favorites or shopping cart (model) of user, recipes
+    already there are skipped. Returns added and unknown recipe ids,
+    nothing is added if some are unknown.
+    """
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    added = timezone.now()
+
+    with transaction.atomic():
+        # concurrent insert of the same row waits and skips it, so
+        # every row is counted once
+        inserted = insert_rows(model, user.pk, recipe_ids, added)
+        if len(inserted) < len(recipe_ids):
+            # skipped recipes are there or unknown
+            known = set(Recipe.objects.filter(
+                pk__in=recipe_ids
+            ).values_list('pk', flat=True))
+            unknown = [pk for pk in recipe_ids if pk not in known]
+            if unknown:
+                transaction.set_rollback(True)
+                return [], unknown
+
+        change_recipes(
+            model, user.pk, [(pk, added) for pk in inserted], 1
+        )
+
+    return inserted, []
+
+
+def remove_recipes(model, user, recipe_ids) -> int:
+    """Remove recipes from favorites or shopping cart, returns number."""
+    with transaction.atomic():
+        # concurrent removal of the same row waits and doesn't find it
+        rows = list(model.objects.select_for_update().filter(
+            user=user, recipe__in=list(recipe_ids)
+        ).values_list('pk', 'recipe', 'created'))
+        if not rows:
+            return 0
+
+        removing.models = (model,)
+        try:
+            model.objects.filter(pk__in=[pk for pk, _, _ in rows]).delete()
+        finally:
+            removing.models = ()
+        change_recipes(
+            model, user.pk, [(recipe_id, date) for _, recipe_id, date in rows],
+            -1,
+        )
+
+    return len(rows)
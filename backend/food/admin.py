@@ -82,9 +82,9 @@ class RecipeAdmin(admin.ModelAdmin):
 
         return res
 
-    @admin.display(description="in_favorites")
+    @admin.display(description="in_favorites", ordering="favorites_count")
     def in_favorites(self, obj):
-        return obj.in_favorite.all().count()
+        return obj.favorites_count
 
 
 @admin.register(Subscribe)
@@ -0,0 +1,139 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from core.autocomplete import get_autocomplete_index
+from core.make_shopping_file import get_ingredients
+from food.models import (Ingredient, IngredientAmount, Recipe, ShoppingCart,
+                         Tag)
+from users.models import User
+
+# compare fast paths with the old ones on current database
+# python manage.py benchmark -a (autocomplete) -s (shopping cart)
+
+
+def measure(function, repeat):
+    # return (milliseconds per call, queries per call)
+    with CaptureQueriesContext(connection) as context:
+        start = perf_counter()
+        for _ in range(repeat):
+            function()
+        elapsed = perf_counter() - start
+
+    return elapsed * 1000 / repeat, len(context.captured_queries) / repeat
+
+
+def report(name, old, new):
+    print(
+        f'{name}: old {old[0]:.3f} ms, {old[1]:.1f} queries; '
+        f'new {new[0]:.3f} ms, {new[1]:.1f} queries; '
+        f'x{old[0] / new[0]:.0f} faster'
+    )
+
+
+def benchmark_autocomplete(repeat):
+    names = list(Ingredient.objects.values_list('name', flat=True)[::50])
+    queries = [name[:length] for name in names for length in (1, 2, 4)]
+    if not queries:
+        print('no ingredients, load them with python manage.py load -i')
+        return
+
+    index = get_autocomplete_index()
+
+    def old():
+        for query in queries:
+            list(Ingredient.objects.filter(name__istartswith=query))
+
+    def new():
+        for query in queries:
+            index.search(query, 10, fill_popular=True)
+
+    old_result = measure(old, repeat)
+    new_result = measure(new, repeat)
+    report(
+        f'autocomplete, {len(queries)} queries',
+        [value / len(queries) for value in old_result],
+        [value / len(queries) for value in new_result],
+    )
+
+
+def fill_shopping_cart(recipes_count, ingredients_per_recipe=10):
+    user = User.objects.create(
+        username='benchmark', email='benchmark@benchmark.com'
+    )
+    tag = Tag.objects.create(name='benchmark', slug='benchmark')
+    # bulk_create doesn't return ids on every database, so select them
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'benchmark {index}', measurement_unit='g')
+        for index in range(recipes_count)
+    )
+    ingredients = Ingredient.objects.filter(name__startswith='benchmark ')
+    IngredientAmount.objects.bulk_create(
+        IngredientAmount(ingredient=ingredient, amount=1)
+        for ingredient in ingredients
+    )
+    amounts = list(IngredientAmount.objects.filter(ingredient__in=ingredients))
+
+    for index in range(recipes_count):
+        recipe = Recipe.objects.create(
+            author=user, name=f'benchmark {index}', image='benchmark.jpg',
+            text='benchmark', cooking_time=1,
+        )
+        recipe.tags.add(tag)
+        recipe.ingredients.add(*(
+            amounts[(index + shift) % len(amounts)]
+            for shift in range(ingredients_per_recipe)
+        ))
+        ShoppingCart.objects.create(user=user, recipe=recipe)
+
+    return user
+
+
+def benchmark_shopping_cart(repeat):
+    for recipes_count in (100, 200, 400, 800):
+        # test data is rolled back
+        with transaction.atomic():
+            user = fill_shopping_cart(recipes_count)
+            milliseconds, queries = measure(
+                lambda: list(get_ingredients(user)), repeat
+            )
+            rows = len(get_ingredients(user))
+            transaction.set_rollback(True)
+
+        print(
+            f'shopping cart, {recipes_count} recipes, {rows} ingredients: '
+            f'{milliseconds:.3f} ms, {queries:.1f} queries'
+        )
+
+
+class Command(BaseCommand):
+    def handle(self, *args, **options):
+        if options['autocomplete']:
+            benchmark_autocomplete(options['repeat'])
+        if options['shopping_cart']:
+            benchmark_shopping_cart(options['repeat'])
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-a',
+            '--autocomplete',
+            action='store_true',
+            default=False,
+            help='ingredients autocomplete'
+        )
+        parser.add_argument(
+            '-s',
+            '--shopping-cart',
+            action='store_true',
+            default=False,
+            help='shopping list of large cart'
+        )
+        parser.add_argument(
+            '-n',
+            '--repeat',
+            type=int,
+            default=10,
+            help='runs of every benchmark'
+        )
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.cache import get_cache_stats, reset_cache_stats
+
+# show hit rate of anonymous responses cache, requests are counted
+# with RESPONSE_CACHE_STATS_RATE > 0
+# python manage.py cache_stats [--reset]
+
+
+class Command(BaseCommand):
+    def handle(self, *args, **options):
+        if not settings.RESPONSE_CACHE_STATS_RATE:
+            print('requests aren\'t counted, RESPONSE_CACHE_STATS_RATE is 0')
+
+        stats = get_cache_stats()
+        print(
+            f"hits: {stats['hits']}, misses: {stats['misses']}, "
+            f"hit rate: {stats['hit_rate']:.1%}"
+        )
+
+        if options['reset']:
+            reset_cache_stats()
+            print('statistics reset')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-r',
+            '--reset',
+            action='store_true',
+            default=False,
+            help='reset statistics after show'
+        )
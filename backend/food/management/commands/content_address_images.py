@@ -0,0 +1,35 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from core.cache import invalidate_recipes
+from food.models import Recipe
+
+# move recipe images saved before content-addressed storage to hash names
+# python manage.py content_address_images
+
+
+class Command(BaseCommand):
+    def handle(self, *args, **options):
+        field = Recipe._meta.get_field('image')
+        moved = []
+
+        for recipe in Recipe.objects.exclude(image='').only(
+            'image'
+        ).order_by('id').iterator():
+            if field.storage.is_content_name(recipe.image.name):
+                continue
+
+            with recipe.image.open('rb') as file:
+                name = field.storage.save(
+                    field.generate_filename(
+                        recipe, os.path.basename(recipe.image.name)
+                    ),
+                    file,
+                )
+
+            Recipe.objects.filter(pk=recipe.pk).update(image=name)
+            moved.append(recipe.pk)
+
+        invalidate_recipes(*moved)
+        print(f'{len(moved)} images moved, remake variants by image_variants')
@@ -0,0 +1,55 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.exports import (delete_expired_exports, fail_interrupted_exports,
+                          run_pending_exports)
+
+# delete expired exports (-c), run lost pending ones and fail
+# interrupted running ones (-r), every EXPORT_CLEAN_INTERVAL seconds
+# with -i
+# python manage.py exports -c -r -i
+
+PENDING_TIMEOUT = 60 * 10  # seconds
+RUNNING_TIMEOUT = 60 * 60  # seconds
+
+
+class Command(BaseCommand):
+    def handle(self, *args, **options):
+        while True:
+            if options['clean']:
+                print(f'{delete_expired_exports()} expired exports deleted')
+            if options['run_pending']:
+                failed = fail_interrupted_exports(RUNNING_TIMEOUT)
+                print(f'{failed} interrupted exports failed')
+                run_pending_exports(PENDING_TIMEOUT)
+                print('pending exports completed')
+
+            if not options['interval']:
+                break
+            time.sleep(settings.EXPORT_CLEAN_INTERVAL)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-c',
+            '--clean',
+            action='store_true',
+            default=False,
+            help='delete expired exports'
+        )
+        parser.add_argument(
+            '-r',
+            '--run-pending',
+            action='store_true',
+            default=False,
+            help='run exports pending longer than 10 minutes, fail ones '
+                 'running longer than an hour'
+        )
+        parser.add_argument(
+            '-i',
+            '--interval',
+            action='store_true',
+            default=False,
+            help='repeat every EXPORT_CLEAN_INTERVAL seconds'
+        )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.feed import rebuild_feeds
+from users.models import User
+
+# rebuild feeds of all users, after changing FEED_FANOUT_LIMIT
+# python manage.py feeds
+
+BATCH_SIZE = 500  # users
+
+
+class Command(BaseCommand):
+    def handle(self, *args, **options):
+        user_ids = list(
+            User.objects.order_by('pk').values_list('pk', flat=True)
+        )
+
+        for start in range(0, len(user_ids), BATCH_SIZE):
+            with transaction.atomic():
+                rebuild_feeds(user_ids[start:start + BATCH_SIZE])
+
+        print(f'feeds of {len(user_ids)} users rebuilt successfully')
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from core.images import make_variants
+from food.models import Recipe
+
+# make resized images for recipes without them, or for all (--all)
+# python manage.py image_variants [--all]
+
+
+class Command(BaseCommand):
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').only(
+            'image', 'image_variants'
+        ).order_by('id')
+        made = failed = 0
+
+        for recipe in recipes.iterator():
+            source = recipe.image_variants.get('source')
+            if source == recipe.image.name and not options['all']:
+                continue
+
+            try:
+                make_variants(recipe.pk)
+                made += 1
+            except Exception as error:
+                failed += 1
+                print(f'recipe {recipe.pk}: {error}')
+
+        print(f'image variants: {made} made, {failed} failed')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            default=False,
+            help='remake variants of all recipes'
+        )
@@ -0,0 +1,71 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.recipe_import import READERS, Checkpoint, RecipeImporter
+
+# import recipes from jsonl or csv file, resumes after interruption
+# python manage.py import_recipes recipes.jsonl [--batch-size 1000]
+# [--images images/] [--restart]
+
+SHOWN_ERRORS = 20
+
+
+class Command(BaseCommand):
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or os.path.splitext(path)[1][1:]
+        if file_format not in READERS:
+            raise CommandError(f'unknown file format {file_format}')
+
+        checkpoint = Checkpoint(path + '.checkpoint')
+        if options['restart']:
+            checkpoint.delete()
+        checkpoint.load()
+        if checkpoint.position:
+            print(f'resume after {checkpoint.position} records')
+
+        importer = RecipeImporter(
+            images_dir=options['images'] or os.path.dirname(path),
+            batch_size=options['batch_size'],
+        )
+        with open(path, encoding='utf-8', newline='') as file:
+            importer.run(READERS[file_format](file), checkpoint)
+
+        for number, error in importer.errors[:SHOWN_ERRORS]:
+            print(f'record {number} skipped: {error!r}')
+        print(
+            f'import recipes completed: {importer.imported} imported, '
+            f'{len(importer.errors)} skipped'
+        )
+        # recipes are added without signals and background tasks
+        print(
+            'run image_variants to make resized images and '
+            'similar_recipes to find similar recipes'
+        )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='jsonl or csv file with recipes')
+        parser.add_argument(
+            '-f',
+            '--format',
+            choices=tuple(READERS),
+            help='file format, by extension by default'
+        )
+        parser.add_argument(
+            '-b',
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='recipes per transaction'
+        )
+        parser.add_argument(
+            '--images',
+            help='directory of image paths, directory of file by default'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            default=False,
+            help='ignore checkpoint and import from the start'
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.ingredient_index import rebuild_index
+
+# rebuild index of recipes by ingredients
+# python manage.py ingredient_index
+
+
+class Command(BaseCommand):
+    def handle(self, *args, **options):
+        print(f'ingredient index of {rebuild_index()} recipes rebuilt')
@@ -1,38 +1,117 @@
-import pandas as pd
+import csv
+from itertools import islice
+
 from django.core.management.base import BaseCommand
-from food.models import Ingredient, Tag
+from django.db import transaction
+
+from core.cache import (INGREDIENTS_VERSION, TAGS_VERSION, bump_versions,
+                        invalidate_recipes)
+from food.models import Ingredient, Recipe, Tag
 
-# use this for load ingredients(-i) and tags(-t)
+# use this for load ingredients(-i) and tags(-t), safe to run again:
+# new rows are inserted, changed tags are updated
 # python manage.py load -i -t
 
+BATCH_SIZE = 1000
+
 
 def loadcsv(file_name: str):
-    return pd.read_csv(f'data/{file_name}.csv')
+    # rows one by one, file isn't read into memory
+    with open(f'data/{file_name}.csv', encoding='utf-8', newline='') as file:
+        rows = csv.DictReader(file)
+        while True:
+            batch = list(islice(rows, BATCH_SIZE))
+            if not batch:
+                return
+            yield batch
+
+
+def report(name, **counts):
+    print(f'import {name} completed successfully: ' + ', '.join(
+        f'{count} {state}' for state, count in counts.items()
+    ))
 
 
 def import_ingredients():
-    data = [
-        Ingredient(
-            name=row['name'],
-            measurement_unit=row['measurement_unit'],
-        )
-        for i, row in loadcsv("ingredients").iterrows()
-    ]
-    Ingredient.objects.bulk_create(data)
-    print('import ingredients completed successfully')
+    # inserted are counted by rows in table, bulk_create returns
+    # ignored conflicting rows too
+    before = Ingredient.objects.count()
+    read = set()
+
+    for batch in loadcsv('ingredients'):
+        # name and measurement unit are the key, so rows aren't updated
+        rows = {
+            (row['name'].strip(), row['measurement_unit'].strip())
+            for row in batch
+        }
+        existing = set(Ingredient.objects.filter(
+            name__in={name for name, _ in rows}
+        ).values_list('name', 'measurement_unit'))
+        new = rows - existing
+        read |= rows
+
+        with transaction.atomic():
+            # ignore rows inserted meanwhile
+            Ingredient.objects.bulk_create(
+                [
+                    Ingredient(name=name, measurement_unit=unit)
+                    for name, unit in new
+                ],
+                ignore_conflicts=True,
+            )
+
+    # bulk_create doesn't send signals
+    bump_versions(INGREDIENTS_VERSION)
+    inserted = Ingredient.objects.count() - before
+    report('ingredients', inserted=inserted, existing=len(read) - inserted)
 
 
 def import_tags():
-    data = [
-        Tag(
-            name=row['name'],
-            color=row['color'],
-            slug=row['slug'],
-        )
-        for i, row in loadcsv("tags").iterrows()
-    ]
-    Tag.objects.bulk_create(data)
-    print('import tags completed successfully')
+    before = Tag.objects.count()
+    read = set()
+    updated = 0
+
+    for batch in loadcsv('tags'):
+        rows = {row['slug'].strip(): row for row in batch}
+        read |= set(rows)
+
+        with transaction.atomic():
+            tags = {
+                tag.slug: tag
+                for tag in Tag.objects.select_for_update().filter(
+                    slug__in=rows
+                )
+            }
+
+            new, changed = [], []
+            for slug, row in rows.items():
+                name, color = row['name'].strip(), row['color'].strip()
+                tag = tags.get(slug)
+
+                if tag is None:
+                    new.append(Tag(name=name, color=color, slug=slug))
+                elif (tag.name, tag.color) != (name, color):
+                    tag.name, tag.color = name, color
+                    changed.append(tag)
+
+            Tag.objects.bulk_create(new, ignore_conflicts=True)
+            Tag.objects.bulk_update(changed, ('name', 'color'))
+            if changed:
+                # recipes show their tags
+                invalidate_recipes(*Recipe.objects.filter(
+                    tags__in=changed
+                ).values_list('id', flat=True).distinct())
+
+        updated += len(changed)
+
+    bump_versions(TAGS_VERSION)
+    inserted = Tag.objects.count() - before
+    report(
+        'tags',
+        inserted=inserted,
+        updated=updated,
+        unchanged=len(read) - inserted - updated,
+    )
 
 
 class Command(BaseCommand):
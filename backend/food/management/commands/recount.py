@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from food.models import Favorite, Recipe, ShoppingCart, Subscribe
+from users.models import User
+
+# rebuild denormalized counters or only check them (--verify)
+# python manage.py recount [--verify]
+
+# (model, counter field, related model, field of related model)
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'shopping_carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscribe, 'subscription'),
+)
+
+
+def actual_count(related_model, related_field):
+    count = related_model.objects.filter(
+        **{related_field: OuterRef('pk')}
+    ).order_by().values(related_field).annotate(
+        count=Count('pk')
+    ).values('count')
+    return Coalesce(Subquery(count), 0)
+
+
+class Command(BaseCommand):
+    def handle(self, *args, **options):
+        for model, field, related_model, related_field in COUNTERS:
+            with transaction.atomic():
+                wrong = model.objects.annotate(
+                    actual=actual_count(related_model, related_field)
+                ).exclude(**{field: F('actual')})
+                print(f'{model.__name__}.{field}: {wrong.count()} wrong')
+
+                if not options['verify']:
+                    model.objects.filter(pk__in=wrong.values('pk')).update(
+                        **{field: actual_count(related_model, related_field)}
+                    )
+
+        if not options['verify']:
+            print('counters rebuilt successfully')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            default=False,
+            help='only check counters'
+        )
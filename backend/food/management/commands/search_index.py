@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.search import index_recipes
+from food.models import Recipe
+
+# index all recipes for search, after upgrade from versions without it
+# python manage.py search_index
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    def handle(self, *args, **options):
+        ids = list(Recipe.objects.values_list('id', flat=True))
+        for start in range(0, len(ids), BATCH_SIZE):
+            index_recipes(ids[start:start + BATCH_SIZE])
+        print(f'search index of {len(ids)} recipes rebuilt')
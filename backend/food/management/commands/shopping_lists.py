@@ -0,0 +1,60 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.shopping_list import aggregate_shopping_lists, rebuild_shopping_lists
+from food.models import ShoppingCart, ShoppingListItem
+
+# rebuild maintained shopping lists or only check them (--verify)
+# python manage.py shopping_lists [--verify]
+
+BATCH_SIZE = 500  # users
+
+
+def get_wrong_users(user_ids) -> list:
+    expected = defaultdict(dict)
+    for item in aggregate_shopping_lists(user_ids):
+        expected[item['user']][item['ingredient']] = item['amount']
+
+    actual = defaultdict(dict)
+    for user_id, ingredient_id, amount in ShoppingListItem.objects.filter(
+        user__in=user_ids
+    ).values_list('user', 'ingredient', 'amount'):
+        actual[user_id][ingredient_id] = amount
+
+    return [
+        user_id for user_id in user_ids
+        if expected[user_id] != actual[user_id]
+    ]
+
+
+class Command(BaseCommand):
+    def handle(self, *args, **options):
+        user_ids = sorted(
+            set(ShoppingCart.objects.values_list('user', flat=True))
+            | set(ShoppingListItem.objects.values_list('user', flat=True))
+        )
+        wrong_count = 0
+
+        for start in range(0, len(user_ids), BATCH_SIZE):
+            batch = user_ids[start:start + BATCH_SIZE]
+
+            with transaction.atomic():
+                wrong = get_wrong_users(batch)
+                wrong_count += len(wrong)
+
+                if wrong and not options['verify']:
+                    rebuild_shopping_lists(wrong)
+
+        print(f'shopping lists: {len(user_ids)} checked, {wrong_count} wrong')
+        if not options['verify']:
+            print('shopping lists rebuilt successfully')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            default=False,
+            help='only check shopping lists'
+        )
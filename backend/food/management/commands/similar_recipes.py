@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from core.similar import rebuild_similar
+
+# precompute similar recipes of all recipes, after import or
+# ingredient index rebuild
+# python manage.py similar_recipes
+
+
+class Command(BaseCommand):
+    def handle(self, *args, **options):
+        done = 0
+        for done in rebuild_similar(options['batch_size']):
+            print(f'{done} recipes done')
+
+        print(f'similar recipes of {done} recipes computed successfully')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-b',
+            '--batch-size',
+            type=int,
+            default=100,
+            help='recipes compared at once'
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from core.trending import recompute_scores
+
+# recompute trending scores of all recipes after changing
+# TRENDING_HALF_LIFE or to drop rounding errors of removed favorites
+# python manage.py trending
+
+
+class Command(BaseCommand):
+    def handle(self, *args, **options):
+        changed = sum(recompute_scores())
+        print(f'trending scores recomputed successfully: {changed} changed')
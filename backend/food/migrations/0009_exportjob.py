@@ -0,0 +1,34 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('food', '0008_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('shopping_cart', 'shopping cart'), ('user_data', 'user data')], max_length=32, verbose_name='kind')),
+                ('file_format', models.CharField(max_length=8, verbose_name='file format')),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('running', 'running'), ('done', 'done'), ('failed', 'failed')], default='pending', max_length=16, verbose_name='status')),
+                ('file', models.FileField(blank=True, upload_to='exports/', verbose_name='file')),
+                ('error', models.TextField(blank=True, verbose_name='error')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='creation date')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='finish date')),
+                ('expires', models.DateTimeField(blank=True, null=True, verbose_name='expiration date')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='export_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('-created',),
+            },
+        ),
+    ]
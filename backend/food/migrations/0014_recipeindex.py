@@ -0,0 +1,27 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0013_recipe_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('ingredient', 'recipes with ingredient'), ('size', 'recipes with number of ingredients'), ('recipe', 'ingredients of recipe')], max_length=16, verbose_name='kind')),
+                ('key', models.PositiveIntegerField(verbose_name='key')),
+                ('ids', models.BinaryField(verbose_name='ids')),
+                ('shard', models.PositiveSmallIntegerField(default=0, verbose_name='shard')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='recipeindex',
+            constraint=models.UniqueConstraint(fields=('kind', 'key', 'shard'), name='recipe_index_kind_key_shard_unique'),
+        ),
+    ]
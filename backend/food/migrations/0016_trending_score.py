@@ -0,0 +1,71 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:15
+
+import math
+
+import django.utils.timezone
+import numpy as np
+from django.conf import settings
+from django.db import migrations, models
+
+# copies of core.trending at the time of the migration
+EPOCH = 1704067200
+WEIGHTS = {'Favorite': 1.0, 'ShoppingCart': 2.0}
+
+
+def fill_scores(apps, schema_editor):
+    # existing favorites and carts are added now, scores of their recipes
+    # are filled at once instead of waiting for `manage.py trending`
+    Recipe = apps.get_model('food', 'Recipe')
+    scores = {}
+    for name, weight in WEIGHTS.items():
+        model = apps.get_model('food', name)
+        for recipe_id, added in model.objects.values_list(
+            'recipe', 'created'
+        ).iterator():
+            term = math.log2(weight) + (
+                (added.timestamp() - EPOCH) / settings.TRENDING_HALF_LIFE
+            )
+            scores[recipe_id] = np.logaddexp2(
+                scores.get(recipe_id, -1e9), term
+            )
+
+    Recipe.objects.bulk_update(
+        [
+            Recipe(pk=recipe_id, score=float(score))
+            for recipe_id, score in scores.items()
+        ],
+        ('score',),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0015_similarrecipe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorite',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='added'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='score',
+            field=models.FloatField(default=-1e9, editable=False, verbose_name='trending score'),
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='added'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-score', '-id'], name='recipe_score_id_idx'),
+        ),
+        migrations.RunPython(fill_scores, migrations.RunPython.noop),
+    ]
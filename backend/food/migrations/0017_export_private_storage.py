@@ -0,0 +1,19 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:28
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0016_trending_score'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportjob',
+            name='file',
+            field=models.FileField(blank=True, storage=core.storage.PrivateStorage(), upload_to='exports/', verbose_name='file'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 20:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0017_export_private_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='started',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='start date'),
+        ),
+    ]
@@ -4,6 +4,7 @@ from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
+from core.storage import private_storage, recipe_storage
 from users.models import User
 
 
@@ -79,6 +80,11 @@ class Recipe(models.Model):
     image = models.ImageField(
         'image',
         upload_to='recipes/',
+        storage=recipe_storage,
+    )
+    # resized copies of image, made by core.images
+    image_variants = models.JSONField(
+        'image variants', default=dict, blank=True, editable=False
     )
     text = models.TextField('description')
 
@@ -100,13 +106,140 @@ class Recipe(models.Model):
         auto_now_add=True,
     )
 
+    # maintained by food.signals, rebuild with python manage.py recount
+    favorites_count = models.PositiveIntegerField(
+        'in favorites', default=0, editable=False
+    )
+    shopping_carts_count = models.PositiveIntegerField(
+        'in shopping carts', default=0, editable=False
+    )
+    # log2 of time-decayed favorites and carts, maintained by core.trending
+    score = models.FloatField(
+        'trending score', default=-1e9, editable=False
+    )
+
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            # keyset pagination of recipes feed
+            models.Index(
+                fields=('-created', '-id'), name='recipe_created_id_idx'
+            ),
+            # feed of authors with many followers, see core.feed
+            models.Index(
+                fields=('author', '-created', '-id'),
+                name='recipe_author_created_idx',
+            ),
+            # ?ordering=trending
+            models.Index(
+                fields=('-score', '-id'), name='recipe_score_id_idx'
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.author.username + ' ' + self.name
 
 
+class RecipeIndex(models.Model):
+    """
+    Sorted ids as array of unsigned 32-bit integers, maintained by
+    core.ingredient_index: recipes with ingredient, recipes with number
+    of ingredients (both split in shards by recipe id), ingredients
+    of recipe.
+    """
+
+    INGREDIENT = 'ingredient'
+    SIZE = 'size'
+    RECIPE = 'recipe'
+    KINDS = (
+        (INGREDIENT, 'recipes with ingredient'),
+        (SIZE, 'recipes with number of ingredients'),
+        (RECIPE, 'ingredients of recipe'),
+    )
+
+    kind = models.CharField('kind', max_length=16, choices=KINDS)
+    key = models.PositiveIntegerField('key')
+    shard = models.PositiveSmallIntegerField('shard', default=0)
+    ids = models.BinaryField('ids')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('kind', 'key', 'shard'),
+                name='recipe_index_kind_key_shard_unique',
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind} {self.key} {self.shard}"
+
+
+class SimilarRecipe(models.Model):
+    """Precomputed neighbour of recipe by ingredients and tags."""
+
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='similar_recipes'
+    )
+    similar = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='+'
+    )
+    score = models.FloatField('score')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('recipe', 'similar'),
+                name='recipe_similar_unique',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('recipe', '-score'), name='similar_recipe_score_idx'
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.recipe} {self.similar}"
+
+
+class FeedEntry(models.Model):
+    """
+    Recipe in feed of follower of its author, written when recipe is
+    created (fan-out on write) for authors with not many followers.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='feed'
+    )
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='feed_entries'
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='+'
+    )
+    # copy of recipe publication date, feed is ordered by it
+    created = models.DateTimeField('publication date')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'), name='user_recipe_feed_unique'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-created', '-recipe'),
+                name='feed_user_created_idx',
+            ),
+            models.Index(
+                fields=('user', 'author'), name='feed_user_author_idx'
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user} {self.recipe}"
+
+
 class Subscribe(models.Model):
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='subscribe_on')
@@ -134,6 +267,7 @@ class FavoriteShoppingCartAbstart(models.Model):
     recipe = models.ForeignKey(
         Recipe, models.CASCADE, related_name='in_%(class)s'
     )
+    created = models.DateTimeField('added', auto_now_add=True)
 
     class Meta:
         abstract = True
@@ -160,3 +294,70 @@ class ShoppingCart(FavoriteShoppingCartAbstart):
                 name="user_recipe_%(class)s_unique"
             )
         ]
+
+
+class ShoppingListItem(models.Model):
+    # total amount of ingredient in shopping cart of user,
+    # maintained by food.signals
+    user = models.ForeignKey(
+        User, models.CASCADE, related_name='shopping_list'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient, models.CASCADE, related_name='shopping_list_items'
+    )
+    amount = models.PositiveIntegerField('amount', default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='user_ingredient_shopping_list_unique'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.ingredient} {self.amount}"
+
+
+class ExportJob(models.Model):
+    SHOPPING_CART = 'shopping_cart'
+    USER_DATA = 'user_data'
+    KINDS = (
+        (SHOPPING_CART, 'shopping cart'),
+        (USER_DATA, 'user data'),
+    )
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'pending'),
+        (RUNNING, 'running'),
+        (DONE, 'done'),
+        (FAILED, 'failed'),
+    )
+
+    user = models.ForeignKey(
+        User, models.CASCADE, related_name='export_jobs'
+    )
+    kind = models.CharField('kind', max_length=32, choices=KINDS)
+    file_format = models.CharField('file format', max_length=8)
+    status = models.CharField(
+        'status', max_length=16, choices=STATUSES, default=PENDING
+    )
+    file = models.FileField(
+        'file', upload_to='exports/', storage=private_storage, blank=True
+    )
+    error = models.TextField('error', blank=True)
+    created = models.DateTimeField('creation date', auto_now_add=True)
+    started = models.DateTimeField('start date', null=True, blank=True)
+    finished = models.DateTimeField('finish date', null=True, blank=True)
+    # file and job are deleted after this date
+    expires = models.DateTimeField('expiration date', null=True, blank=True)
+
+    class Meta:
+        ordering = ('-created',)
+
+    def __str__(self):
+        return f"{self.user} {self.kind} {self.status}"
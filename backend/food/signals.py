@@ -0,0 +1,287 @@
+from django.conf import settings
+from django.db.models import F
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from core.background import run_in_background, run_once_in_background
+from core.cache import (INGREDIENTS_VERSION, TAGS_VERSION, bump_versions,
+                        invalidate_recipes, viewer_version_key)
+from core.feed import backfill, backfill_followers, fan_out, remove
+from core.ingredient_index import update_recipes_on_commit
+from core.search import delete_recipes, index_recipes_on_commit
+from core.shopping_list import (change_recipe_ingredients, existing_pairs,
+                                get_cart_users, rebuild_shopping_lists)
+from core.similar import refresh_similar, update_similar
+from core.user_recipes import change_recipes, is_counted
+from users.models import User
+
+from .models import (Favorite, Ingredient, IngredientAmount, Recipe,
+                     ShoppingCart, SimilarRecipe, Subscribe, Tag)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    invalidate_recipes(instance.pk)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_relations_changed(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    if not action.startswith('post_'):
+        return
+
+    if not reverse:
+        invalidate_recipes(instance.pk)
+    elif pk_set:
+        invalidate_recipes(*pk_set)
+    else:
+        # reverse clear, recipes already unknown
+        invalidate_recipes()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    bump_versions(TAGS_VERSION)
+    invalidate_recipes(
+        *Recipe.objects.filter(tags=instance).values_list('id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    bump_versions(INGREDIENTS_VERSION)
+    invalidate_recipes(
+        *Recipe.objects.filter(
+            ingredients__ingredient=instance
+        ).values_list('id', flat=True)
+    )
+
+
+@receiver(post_save, sender=IngredientAmount)
+@receiver(post_delete, sender=IngredientAmount)
+def ingredient_amount_changed(sender, instance, **kwargs):
+    invalidate_recipes(
+        *Recipe.objects.filter(
+            ingredients=instance
+        ).values_list('id', flat=True)
+    )
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    # login updates only last_login, that isn't shown in recipes
+    if created or update_fields == frozenset(('last_login',)):
+        return
+
+    recipe_ids = list(instance.recipes.values_list('id', flat=True))
+    if recipe_ids:
+        invalidate_recipes(*recipe_ids)
+
+
+@receiver(post_save, sender=Subscribe)
+@receiver(post_delete, sender=Subscribe)
+def viewer_relations_changed(sender, instance, **kwargs):
+    bump_versions(viewer_version_key(instance.user_id))
+
+
+def change_counter(model, pk, field, delta):
+    model.objects.filter(pk=pk).update(**{field: F(field) + delta})
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def user_recipe_added(sender, instance, created, **kwargs):
+    # counters, trending score, shopping list and viewer version
+    if created:
+        change_recipes(
+            sender, instance.user_id,
+            [(instance.recipe_id, instance.created)], 1,
+        )
+
+
+# pre_delete, because on recipe delete its ingredients may be
+# already deleted by the moment of post_delete
+@receiver(pre_delete, sender=Favorite)
+@receiver(pre_delete, sender=ShoppingCart)
+def user_recipe_removed(sender, instance, **kwargs):
+    if not is_counted(sender):
+        change_recipes(
+            sender, instance.user_id,
+            [(instance.recipe_id, instance.created)], -1,
+        )
+
+
+@receiver(post_save, sender=Subscribe)
+def subscribe_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.subscription_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Subscribe)
+def subscribe_deleted(sender, instance, **kwargs):
+    change_counter(User, instance.subscription_id, 'followers_count', -1)
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def shopping_list_ingredients_changed(sender, instance, action, reverse,
+                                      pk_set, **kwargs):
+    # only existing pairs are removed, pk_set of remove isn't checked
+    instance_field = 'ingredientamount' if reverse else 'recipe'
+    related_field = 'recipe' if reverse else 'ingredientamount'
+
+    if action == 'post_add':
+        pairs = [(instance.pk, pk) for pk in pk_set]
+        if reverse:
+            pairs = [(pk, instance.pk) for pk in pk_set]
+        change_recipe_ingredients(pairs, 1)
+    elif action == 'pre_remove':
+        change_recipe_ingredients(existing_pairs(**{
+            instance_field: instance.pk, f'{related_field}__in': pk_set
+        }), -1)
+    elif action == 'pre_clear':
+        change_recipe_ingredients(
+            existing_pairs(**{instance_field: instance.pk}), -1
+        )
+
+
+@receiver(pre_delete, sender=IngredientAmount)
+def shopping_list_ingredient_amount_deleted(sender, instance, **kwargs):
+    # recipe relations are deleted by cascade without m2m_changed
+    change_recipe_ingredients(existing_pairs(ingredientamount=instance), -1)
+
+
+@receiver(post_save, sender=IngredientAmount)
+def shopping_list_ingredient_amount_changed(sender, instance, created,
+                                            **kwargs):
+    if created:
+        return
+
+    recipe_ids = Recipe.objects.filter(
+        ingredients=instance
+    ).values_list('id', flat=True)
+    user_ids = {
+        user_id
+        for users in get_cart_users(recipe_ids).values()
+        for user_id in users
+    }
+    if user_ids:
+        rebuild_shopping_lists(user_ids)
+
+
+@receiver(post_save, sender=Recipe)
+def feed_recipe_created(sender, instance, created, **kwargs):
+    if created:
+        fan_out([instance])
+
+
+@receiver(post_save, sender=Subscribe)
+def feed_subscribe_created(sender, instance, created, **kwargs):
+    if created:
+        backfill([(instance.user_id, instance.subscription_id)])
+
+
+@receiver(post_delete, sender=Subscribe)
+def feed_subscribe_deleted(sender, instance, **kwargs):
+    remove(instance.user_id, instance.subscription_id)
+
+    # followers_count is already decreased
+    if User.objects.filter(
+        pk=instance.subscription_id,
+        followers_count=settings.FEED_FANOUT_LIMIT - 1,
+    ).exists():
+        run_in_background(backfill_followers, instance.subscription_id)
+
+
+@receiver(post_save, sender=Recipe)
+def search_recipe_saved(sender, instance, **kwargs):
+    index_recipes_on_commit(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def search_recipe_deleted(sender, instance, **kwargs):
+    delete_recipes([instance.pk])
+    update_recipes_on_commit(instance.pk)
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def search_ingredients_changed(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    if not reverse and action.startswith('post_'):
+        recipe_ids = [instance.pk]
+    elif reverse and action.startswith('pre_'):
+        # before clear, recipes of ingredient amount are still known
+        recipe_ids = list(pk_set or Recipe.objects.filter(
+            ingredients=instance
+        ).values_list('id', flat=True))
+    else:
+        return
+
+    index_recipes_on_commit(*recipe_ids)
+    update_recipes_on_commit(*recipe_ids)
+    # after ingredient index is updated
+    run_once_in_background(refresh_similar, recipe_ids)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=IngredientAmount)
+@receiver(pre_delete, sender=IngredientAmount)
+def search_ingredient_changed(sender, instance, **kwargs):
+    if kwargs.get('created'):
+        return
+
+    lookup = 'ingredients__ingredient' if sender is Ingredient else (
+        'ingredients'
+    )
+    recipe_ids = list(Recipe.objects.filter(
+        **{lookup: instance}
+    ).values_list('id', flat=True).distinct())
+
+    index_recipes_on_commit(*recipe_ids)
+    if sender is IngredientAmount:
+        update_recipes_on_commit(*recipe_ids)
+        run_once_in_background(refresh_similar, recipe_ids)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def similar_tags_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if not reverse and action.startswith('post_'):
+        run_once_in_background(refresh_similar, [instance.pk])
+    elif reverse and action.startswith('pre_'):
+        run_once_in_background(refresh_similar, list(
+            pk_set or Recipe.objects.filter(
+                tags=instance
+            ).values_list('id', flat=True)
+        ))
+
+
+@receiver(pre_delete, sender=Recipe)
+def similar_recipe_deleting(sender, instance, **kwargs):
+    # recipes with deleted neighbour, before rows are deleted by cascade
+    instance.similar_dependents = list(SimilarRecipe.objects.filter(
+        similar=instance
+    ).values_list('recipe', flat=True))
+
+
+@receiver(post_delete, sender=Recipe)
+def similar_recipe_deleted(sender, instance, **kwargs):
+    # after ingredient index is updated, dependents get another neighbour
+    run_in_background(
+        update_similar, getattr(instance, 'similar_dependents', [])
+    )
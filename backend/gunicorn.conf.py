@@ -0,0 +1,38 @@
+import gc
+import os
+
+# gunicorn -c gunicorn.conf.py backend.wsgi
+
+bind = '0.0.0.0:8000'
+workers = int(os.getenv('GUNICORN_WORKERS', 3))
+
+# Load application in master process once, workers get it
+# (with warmed tags and ingredients catalogs) copy-on-write after fork.
+# Use shared CACHE_BACKEND with several workers, versions of catalogs
+# are stored there.
+preload_app = True
+
+
+def when_ready(server):
+    from django.conf import settings
+    from django.db import connections
+
+    from core.autocomplete import get_autocomplete_index
+    from core.catalog import warm_up
+
+    backend = settings.CACHES['default']['BACKEND']
+    if server.cfg.workers > 1 and backend.endswith('.LocMemCache'):
+        # versions bumped in one worker wouldn't be seen by others,
+        # they would serve stale responses and logged out tokens
+        raise RuntimeError(
+            f'{backend} is not shared by {server.cfg.workers} workers, '
+            f'set CACHE_BACKEND or GUNICORN_WORKERS=1'
+        )
+
+    warm_up()
+    get_autocomplete_index()
+
+    # workers must not share database connection of master
+    connections.close_all()
+    # keep loaded objects out of gc, so it doesn't touch their pages
+    gc.freeze()
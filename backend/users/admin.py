@@ -6,4 +6,11 @@ from .models import User
 
 @admin.register(User)
 class MyUserAdmin(UserAdmin):
-    list_display = ('username', 'email', 'is_staff', 'pk')
+    list_display = (
+        'username',
+        'email',
+        'is_staff',
+        'pk',
+        'recipes_count',
+        'followers_count',
+    )
@@ -0,0 +1,118 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from rest_framework.authentication import TokenAuthentication
+
+from core.cache import bump_versions, get_versions
+
+from .models import User
+
+# cached fields of user, password hash and counters (updated by other
+# requests) aren't cached, they are deferred and loaded from the database
+# on access, so save() of cached user doesn't write them back
+USER_FIELDS = [
+    field.attname
+    for field in User._meta.concrete_fields
+    if field.attname not in ('password', 'recipes_count', 'followers_count')
+]
+
+
+def auth_version_key(user_id) -> str:
+    # tokens, password and activity of the user
+    return f'version:auth:{user_id}'
+
+
+def invalidate_auth(user_id):
+    bump_versions(auth_version_key(user_id))
+
+
+class LRUCache:
+    """Bounded per-process cache, least recently used items go first."""
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+
+            value, expires = item
+            if expires < time.monotonic():
+                del self.items[key]
+                return None
+
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = (value, time.monotonic() + self.timeout)
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+
+tokens = LRUCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TIMEOUT)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication with token and its user cached in process and
+    in the shared cache, without password hash. Cached token is used
+    while auth version of its user is the same: version is bumped on
+    logout, user change and deletion (users.signals) and is read from
+    the shared cache by every request, so a token works in no worker
+    after logout. Request makes one cache round-trip instead of two
+    queries, or two round-trips if token isn't cached in the process.
+    """
+
+    def authenticate_credentials(self, key):
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        cache_key = f'auth:token:{digest}'
+
+        local = tokens.get(digest)
+        data = local or cache.get(cache_key)
+        if data is not None:
+            user_values, created, version = data
+            user_id = user_values[USER_FIELDS.index(User._meta.pk.attname)]
+            if get_versions(auth_version_key(user_id)) == [version]:
+                if local is None:
+                    tokens.set(digest, data)
+                return self.load(key, user_values, created)
+
+        user, token = super().authenticate_credentials(key)
+        # token deleted between the query and reading of version
+        # stays cached not longer than timeout
+        version, = get_versions(auth_version_key(user.pk))
+        data = (
+            [getattr(user, name) for name in USER_FIELDS],
+            token.created,
+            version,
+        )
+        cache.set(cache_key, data, settings.AUTH_CACHE_TIMEOUT)
+        tokens.set(digest, data)
+        return user, token
+
+    def load(self, key, user_values, created):
+        # new instances for every request, as if loaded from database
+        model = self.get_model()
+        user = User.from_db(
+            router.db_for_read(User), USER_FIELDS, user_values
+        )
+        token = model.from_db(
+            router.db_for_read(model),
+            ['key', 'user_id', 'created'],
+            [key, user.pk, created],
+        )
+        token.user = user
+        return user, token
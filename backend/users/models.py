@@ -12,6 +12,14 @@ class User(AbstractUser):
         unique=True
     )
 
+    # maintained by food.signals, rebuild with python manage.py recount
+    recipes_count = models.PositiveIntegerField(
+        'recipes count', default=0, editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'followers count', default=0, editable=False
+    )
+
     # https://code.djangoproject.com/ticket/20097
     USERNAME_FIELD = 'email'
     AbstractUser.REQUIRED_FIELDS = ['username']
@@ -11,8 +11,17 @@ class UserSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     def get_is_subscribed(self, user):
+        viewer = self.context['request'].user
+
+        if not viewer.is_authenticated:
+            return False
+
+        # may be annotated by queryset to avoid query per user
+        if hasattr(user, 'is_subscribed'):
+            return user.is_subscribed
+
         return Subscribe.objects.filter(
-            Q(subscription=user) & Q(user=self.context['request'].user.id)
+            Q(subscription=user) & Q(user=viewer)
         ).exists()
 
     class Meta:
@@ -34,7 +43,7 @@ class PostUserSerializer(serializers.ModelSerializer):
         password = validated_data.pop('password')
         user = super().create(validated_data)
         user.set_password(password)
-        user.save()
+        user.save(update_fields=['password'])
         return user
 
     def validate_password(self, value):
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_auth
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Token)
+def auth_changed(sender, instance, **kwargs):
+    # logout, password change, deactivation
+    invalidate_auth(instance.pk if sender is User else instance.user_id)
@@ -71,6 +71,6 @@ class UserViewSet(UserMixin):
 
             # set_password also hashes the password that the user will get
             user.set_password(serializer.data.get("new_password"))
-            user.save()
+            user.save(update_fields=['password'])
 
             return Response(status=status.HTTP_204_NO_CONTENT)